@@ -5,20 +5,41 @@ import sys
 import os
 import logging
 import base64
+import copy
+import gc
+import hashlib
 import traceback
 import ctypes
 import tempfile
 import subprocess
+import io
+import json
+import multiprocessing
+import queue
 import re
 import html
+import shutil
+import struct
+import threading
 import time
 import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
-import xml.etree.ElementTree as ET
+
+# lxml 为 C 实现，解析/遍历远快于标准库；缺失时回退到 ElementTree
+try:
+    from lxml import etree as ET  # type: ignore
+    LXML_AVAILABLE = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    LXML_AVAILABLE = False
 
 # ======= 依赖（尽量最少） =======
 try:
+    import pythoncom  # type: ignore
     import win32com.client  # type: ignore
     import comtypes.client  # type: ignore
     COM_AVAILABLE = True
@@ -35,15 +56,16 @@ from PyQt5.QtCore import Qt, QTimer, QDateTime, QThread, pyqtSignal, QCoreApplic
 
 # Word/PDF 依赖
 from docx import Document
-from docx.shared import Inches, Cm, Pt, RGBColor
+from docx.shared import Inches, Cm, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml.shared import OxmlElement, qn
 from docx.opc.constants import RELATIONSHIP_TYPE as RT
 from docx.enum.section import WD_ORIENT, WD_SECTION
 
+from reportlab import rl_config
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Image as RLImage,
+    BaseDocTemplate, PageTemplate, Frame, Paragraph, Spacer, Image as RLImage,
     Table, TableStyle, KeepInFrame, PageBreak
 )
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -55,6 +77,15 @@ from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
 
 
 # ======= 工具函数 =======
+# 本程序的临时数据统一放在系统临时目录下的同一子目录中
+APP_TEMP_ROOT = Path(tempfile.gettempdir()) / 'onenote_exporter'
+
+
+def app_temp_root() -> str:
+    APP_TEMP_ROOT.mkdir(parents=True, exist_ok=True)
+    return str(APP_TEMP_ROOT)
+
+
 def is_admin() -> bool:
     try:
         return ctypes.windll.shell32.IsUserAnAdmin()
@@ -70,9 +101,82 @@ def check_onenote_process() -> bool:
         return False
 
 
+def parse_xml(xml: str):
+    """解析OneNote XML字符串（lxml不接受带编码声明的str，统一转为UTF-8字节）"""
+    if LXML_AVAILABLE:
+        # huge_tree: 允许超过10MB的文本节点（大图片的base64数据）
+        return ET.fromstring(xml.encode('utf-8'), ET.XMLParser(huge_tree=True))
+    return ET.fromstring(xml)
+
+
+def iterwalk(root, tags: Optional[Tuple[str, ...]] = None):
+    """深度优先遍历，依次产生('start'|'end', 元素)事件；
+    lxml下可用tags（如'{*}Table'）在C层过滤，标准库回退时忽略tags由调用方自行判断"""
+    if LXML_AVAILABLE:
+        yield from ET.iterwalk(root, events=('start', 'end'), tag=tags)
+        return
+    # 标准库没有iterwalk，用显式栈代替递归
+    yield 'start', root
+    stack = [(root, iter(root))]
+    while stack:
+        elem, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            yield 'end', elem
+        else:
+            yield 'start', child
+            stack.append((child, iter(child)))
+
+
+def localname(tag: str) -> str:
+    """去掉命名空间前缀：'{ns}T' -> 'T'"""
+    i = tag.rfind('}')
+    return tag[i+1:] if i >= 0 else tag
+
+
+# 预编译的正则与字符集
+_RE_TAG = re.compile(r'<[^>]+>')
+_RE_TABWS = re.compile(r'[\t\x0b\x0c]+')
+# Word运行文本中需转为<w:tab/>/<w:br/>的字符（与add_run的处理一致）
+_RE_WORD_BREAKS = re.compile(r'(\r\n|[\t\r\n])')
+_RE_B64 = re.compile(r'[A-Za-z0-9+/=\s]+\Z')
+_SPECIAL_CHARS = str.maketrans({
+    '\u2013': '-',
+    '\u201c': '"', '\u201d': '"',
+    '\u2018': "'", '\u2019': "'",
+})
+
+# 页面内容遍历只关心的元素，lxml在C层按标签过滤
+_CONTENT_TAGS = ('{*}Table', '{*}Image', '{*}OE', '{*}T')
+
+# PDF页面几何常量（A4，左右边距共3cm，上下共4cm）
+_PAGE_W_USABLE = A4[0] - 3*cm
+_PAGE_H_USABLE = A4[1] - 4*cm
+_MIN_COL_W = 1.2*cm
+_DEFAULT_IMG_SIZE = (4*inch, 3*inch)
+
+# PDF版式固定：页边距与正文框只创建一次，每个文档使用浅拷贝
+_PDF_MARGINS = dict(leftMargin=1.5*cm, rightMargin=1.5*cm, topMargin=2*cm, bottomMargin=2*cm)
+_PDF_FRAME = Frame(1.5*cm, 2*cm, _PAGE_W_USABLE, _PAGE_H_USABLE, id='normal')
+
+# PDF表格单元格截断
+_CELL_LIMIT = 150
+_CELL_TRUNC = 147
+_ELLIPSIS = '...'
+
+
+def iter_local(parent, name: str):
+    """命名空间无关地迭代parent下名为name的后代元素（不含parent自身）"""
+    if LXML_AVAILABLE:
+        # lxml的iter('{*}name')在C层完成过滤，但会包含parent自身
+        return (el for el in parent.iter(f'{{*}}{name}') if el is not parent)
+    return parent.iterfind(f'.//{{*}}{name}')
+
+
 # ======= 一些轻量 UI 组件 =======
 from PyQt5.QtCore import QTimer
-from PyQt5.QtGui import QPainter, QPen, QColor
+from PyQt5.QtGui import QPainter, QPen, QColor, QTextCursor
 
 
 class LoadingIndicator(QWidget):
@@ -135,82 +239,150 @@ class StatusIndicator(QWidget):
 
 # ======= OneNote API（COM优先，PowerShell回退） =======
 class OneNoteAPI:
+    # 页面XML可能内嵌大量base64图片，缓存条数不宜过多
+    PAGE_CACHE_SIZE = 32
+    HIERARCHY_TTL = 30.0
+    # 记录上次成功的COM绑定方式，下次启动优先使用；与各次导出的临时目录放在同一父目录下
+    COM_KIND_FILE = APP_TEMP_ROOT / 'com_kind.json'
+
     def __init__(self):
         self.app = None
-        self.temp_dir = tempfile.mkdtemp(prefix='onenote_app_')
         self.logger = logging.getLogger('OneNoteAPI')
+        self._ps_proc: Optional[subprocess.Popen] = None
+        self._ps_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._page_cache: 'OrderedDict[str, str]' = OrderedDict()
+        self._hier_cache: Optional[Tuple[float, Dict]] = None
+
+    def _load_com_kind(self) -> Optional[str]:
+        try:
+            return json.loads(self.COM_KIND_FILE.read_text(encoding='utf-8')).get('kind')
+        except Exception:
+            return None
+
+    def _save_com_kind(self, kind: str):
+        try:
+            self.COM_KIND_FILE.parent.mkdir(parents=True, exist_ok=True)
+            self.COM_KIND_FILE.write_text(json.dumps({'kind': kind}), encoding='utf-8')
+        except Exception as e:
+            self.logger.debug(f'保存COM方式失败: {e}')
 
     def initialize(self) -> bool:
         try:
             if not COM_AVAILABLE:
                 raise RuntimeError('COM not available')
+            # 本进程内已连接成功：代理仍可用则直接复用；OneNote重启或崩溃后旧代理失效，重新创建
+            if self.app is not None:
+                try:
+                    _ = self.app.GetHierarchy('', 1)
+                    return True
+                except Exception as e:
+                    self.logger.warning(f'COM连接已失效，重新连接: {e}')
+                    self.app = None
             admin = is_admin(); running = check_onenote_process()
             self.logger.info(f'权限: admin={admin}, running={running}')
-            # 尝试三种COM
-            try:
-                self.app = win32com.client.gencache.EnsureDispatch('OneNote.Application')
-                _ = self.app.GetHierarchy('', 1)
-                return True
-            except Exception as e:
-                self.logger.warning(f'gencache失败: {e}')
-            try:
-                self.app = win32com.client.Dispatch('OneNote.Application')
-                _ = self.app.GetHierarchy('', 1)
-                return True
-            except Exception as e:
-                self.logger.warning(f'Dispatch失败: {e}')
-            try:
-                self.app = comtypes.client.CreateObject('OneNote.Application')
-                _ = self.app.GetHierarchy('', 1)
-                return True
-            except Exception as e:
-                self.logger.warning(f'comtypes失败: {e}')
+            # 尝试三种COM，上次成功的方式优先
+            factories = [
+                ('gencache', lambda: win32com.client.gencache.EnsureDispatch('OneNote.Application')),
+                ('Dispatch', lambda: win32com.client.Dispatch('OneNote.Application')),
+                ('comtypes', lambda: comtypes.client.CreateObject('OneNote.Application')),
+            ]
+            cached = self._load_com_kind()
+            factories.sort(key=lambda kv: kv[0] != cached)
+            for kind, factory in factories:
+                try:
+                    self.app = factory()
+                    # 新建的代理都要验证：缓存的方式也可能
+                    # 返回能创建却不可用的代理（生成模块过期、OneNote重新注册等）
+                    _ = self.app.GetHierarchy('', 1)
+                    if kind != cached:
+                        self._save_com_kind(kind)
+                    return True
+                except Exception as e:
+                    self.logger.warning(f'{kind}失败: {e}')
             # 退到仅PS
             self.app = None
             return True
         except Exception as e:
+            self.app = None
             self.logger.error(f'初始化失败: {e}')
             return False
 
-    def _ps(self, script: str) -> str:
-        f = Path(self.temp_dir) / 'tmp.ps1'
-        f.write_text(script, encoding='utf-8')
-        r = subprocess.run(['powershell', '-ExecutionPolicy', 'Bypass', '-File', str(f)], capture_output=True, text=True, encoding='utf-8', errors='replace')
-        return (r.stdout or '')
+    def _ps_session(self) -> subprocess.Popen:
+        """启动（或复用）常驻PowerShell进程，OneNote COM对象只创建一次"""
+        if self._ps_proc is not None and self._ps_proc.poll() is None:
+            return self._ps_proc
+        self._ps_proc = subprocess.Popen(
+            ['powershell', '-NoLogo', '-NoProfile', '-NonInteractive',
+             '-ExecutionPolicy', 'Bypass', '-OutputFormat', 'Text', '-Command', '-'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding='utf-8', errors='replace',
+            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+        self._ps_proc.stdin.write('[Console]::OutputEncoding=[System.Text.Encoding]::UTF8; $o=$null\n')
+        self._ps_proc.stdin.flush()
+        return self._ps_proc
+
+    def _ps(self, command: str) -> str:
+        """在常驻会话中执行单行命令，读取输出直到结束标记"""
+        marker = f'<<END>>{uuid.uuid4().hex}'
+        with self._ps_lock:
+            for attempt in range(2):
+                try:
+                    proc = self._ps_session()
+                    proc.stdin.write(f"{command}; Write-Output '{marker}'\n")
+                    proc.stdin.flush()
+                    lines = []
+                    for line in proc.stdout:
+                        if line.rstrip('\r\n') == marker:
+                            return ''.join(lines)
+                        lines.append(line)
+                    raise RuntimeError('PowerShell会话意外退出')
+                except Exception as e:
+                    self.logger.warning(f'PowerShell会话失败(第{attempt+1}次): {e}')
+                    self.close()
+        return ''
 
-    def _get_hierarchy_ps(self, obj_id: str, scope: int) -> str:
-        obj = obj_id.replace('"','""') if obj_id else ''
-        sc = scope
-        script = f"""
-        [Console]::OutputEncoding=[System.Text.Encoding]::UTF8
-        try {{
-          $o=New-Object -ComObject OneNote.Application
-          $x=""
-          $o.GetHierarchy("{obj}",{sc},[ref]$x)
-          Write-Output "SUCCESS:$x"
-        }} catch {{ Write-Output "ERROR:$($_.Exception.Message)" }}
-        """
+    def _ps_call(self, call: str) -> str:
+        script = ("try { if (-not $o) { $o=New-Object -ComObject OneNote.Application }; $x=''; "
+                  f"$o.{call}; Write-Output \"SUCCESS:$x\" }} "
+                  "catch { $o=$null; Write-Output \"ERROR:$($_.Exception.Message)\" }")
         out = self._ps(script).strip()
         if out.startswith('SUCCESS:'): return out[8:]
         return ''
 
+    def _get_hierarchy_ps(self, obj_id: str, scope: int) -> str:
+        obj = obj_id.replace('"','""') if obj_id else ''
+        return self._ps_call(f'GetHierarchy("{obj}",{scope},[ref]$x)')
+
     def _get_page_ps(self, page_id: str) -> str:
         pid = page_id.replace('"','""')
-        script = f"""
-        [Console]::OutputEncoding=[System.Text.Encoding]::UTF8
-        try {{
-          $o=New-Object -ComObject OneNote.Application
-          $x=""
-          $o.GetPageContent("{pid}",[ref]$x,7)
-          Write-Output "SUCCESS:$x"
-        }} catch {{ Write-Output "ERROR:$($_.Exception.Message)" }}
-        """
-        out = self._ps(script).strip()
-        if out.startswith('SUCCESS:'): return out[8:]
-        return ''
+        return self._ps_call(f'GetPageContent("{pid}",[ref]$x,7)')
+
+    def close(self):
+        """结束常驻PowerShell进程"""
+        proc, self._ps_proc = self._ps_proc, None
+        if proc is None:
+            return
+        try:
+            if proc.poll() is None:
+                proc.stdin.write('exit\n')
+                proc.stdin.flush()
+                proc.wait(2)
+        except Exception:
+            proc.kill()
+
+    def invalidate_cache(self):
+        """清空页面与层级缓存（刷新笔记本时调用）"""
+        with self._cache_lock:
+            self._page_cache.clear()
+            self._hier_cache = None
 
     def get_notebooks(self) -> Dict:
         """获取笔记本列表，优化版本"""
+        cached = self._hier_cache
+        if cached and time.monotonic() - cached[0] < self.HIERARCHY_TTL:
+            return cached[1]
+        
         xml = ''
         try:
             if self.app:
@@ -226,44 +398,69 @@ class OneNoteAPI:
         if not xml:
             return {}
         
-        try:
-            root = ET.fromstring(xml)
-        except Exception:
-            return {}
-        
-        def findall_local(p, name):
-            return [e for e in p.iter() if (isinstance(e.tag,str) and (e.tag.endswith('}'+name) or e.tag==name or e.tag.split('}')[-1]==name))]
-        
+        # 流式解析：元素闭合时挂到待定列表，随后立即释放，内存占用与层级宽度无关
         notebooks={}
-        for nb in findall_local(root, 'Notebook'):
-            nb_id = nb.get('ID')
-            nb_name = nb.get('name')
-            if not nb_id or not nb_name: 
-                continue
-            
-            sections={}
-            for sec in findall_local(nb,'Section'):
-                sid = sec.get('ID')
-                sname = sec.get('name')
-                if not sid or not sname: 
-                    continue
-                
-                pages={}
-                for pg in findall_local(sec,'Page'):
-                    pid = pg.get('ID')
-                    pname = pg.get('name')
+        sections={}
+        pages={}
+        try:
+            src = io.BytesIO(xml.lstrip('\ufeff').encode('utf-8'))
+            if LXML_AVAILABLE:
+                events = ET.iterparse(src, events=('end',), huge_tree=True,
+                                      tag=('{*}Notebook', '{*}Section', '{*}Page'))
+            else:
+                events = ET.iterparse(src, events=('end',))
+            for _, el in events:
+                name = localname(el.tag)
+                if name == 'Page':
+                    pid = el.get('ID')
+                    pname = el.get('name')
                     if pid and pname:
                         pages[pid] = {'id':pid, 'name':pname}
-                
-                sections[sid] = {'id':sid, 'name':sname, 'pages':pages}
-            
-            notebooks[nb_id] = {'id':nb_id, 'name':nb_name, 'sections':sections}
+                elif name == 'Section':
+                    sid = el.get('ID')
+                    sname = el.get('name')
+                    if sid and sname:
+                        sections[sid] = {'id':sid, 'name':sname, 'pages':pages}
+                    pages = {}
+                elif name == 'Notebook':
+                    nb_id = el.get('ID')
+                    nb_name = el.get('name')
+                    if nb_id and nb_name:
+                        notebooks[nb_id] = {'id':nb_id, 'name':nb_name, 'sections':sections}
+                    sections = {}
+                else:
+                    continue
+                # 已处理的元素及其前序兄弟不再需要
+                if LXML_AVAILABLE:
+                    el.clear(keep_tail=True)
+                    while el.getprevious() is not None:
+                        del el.getparent()[0]
+                else:
+                    el.clear()
+        except Exception:
+            return {}
         
+        if notebooks:
+            self._hier_cache = (time.monotonic(), notebooks)
         return notebooks
 
     def get_page_content(self, page_id: str, max_retries: int = 3) -> str:
         """获取页面内容，增加重试机制"""
+        with self._cache_lock:
+            if page_id in self._page_cache:
+                self._page_cache.move_to_end(page_id)
+                return self._page_cache[page_id]
+        content = self._fetch_page_content(page_id, max_retries)
+        if content:
+            with self._cache_lock:
+                self._page_cache[page_id] = content
+                if len(self._page_cache) > self.PAGE_CACHE_SIZE:
+                    self._page_cache.popitem(last=False)
+        return content
+
+    def _fetch_page_content(self, page_id: str, max_retries: int) -> str:
         for attempt in range(max_retries):
+            err: Optional[Exception] = None
             try:
                 if self.app:
                     try:
@@ -282,20 +479,37 @@ class OneNoteAPI:
                 if content and content.strip():
                     return content
             except Exception as e:
-                self.logger.warning(f"获取页面内容失败 (尝试 {attempt+1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
-                    self.logger.error(f"无法获取页面 {page_id} 的内容: {e}")
-                else:
-                    time.sleep(1)
+                err = e
+            # 各获取方式失败时多数只返回空内容而不抛异常，因此每次未取到内容都要退避
+            self.logger.warning(f"获取页面内容失败 (尝试 {attempt+1}/{max_retries}): {err or '内容为空'}")
+            if attempt < max_retries - 1:
+                time.sleep(0.5 * 2 ** attempt)  # 指数退避
+        self.logger.error(f"无法获取页面 {page_id} 的内容")
         return ''
 
 
 # ======= 增强的解析器（Word / PDF） =======
+_CHINESE_FONT: Optional[str] = None  # 本进程已注册的中文字体名
+
+
 class EnhancedOneNoteContentParser:
     def __init__(self):
         self.logger = logging.getLogger('EnhancedParser')
         self.temp_files: List[str] = []
+        self._image_cache: Dict[bytes, str] = {}  # 图片内容哈希 -> 临时文件
+        self._img_dir: Optional[str] = None  # 图片临时目录，首次使用时创建
+        self._tmpdir: Optional[Path] = None  # 调用方提供的临时目录（生命周期由调用方管理）
+        self._image_dim_cache: Dict[bytes, Tuple[float, float]] = {}  # 图片内容哈希 -> PDF显示尺寸（跨页面保留）
+        self._docx_template: Optional[bytes] = None  # 空白Word模板，首次使用时生成
+        
+        # 可能携带图片数据的属性（按优先级）
+        self._image_attributes = (
+            'data', 'Data', 'binaryData', 'base64Data', 'imageData',
+            'src', 'source', 'content', 'bytes', 'binary'
+        )
+        self._image_attr_set = frozenset(self._image_attributes)
         self._setup_chinese_fonts()
+        self._setup_pdf_styles()
         
         # 增强的图片格式支持
         self.supported_image_extensions = {
@@ -307,9 +521,15 @@ class EnhancedOneNoteContentParser:
             b'BM': '.bmp',
             b'RIFF': '.webp'
         }
+        self._sig_tuple = tuple(self.supported_image_extensions)
+        self._sig_map = list(self.supported_image_extensions.items())
     
     def _setup_chinese_fonts(self):
-        """设置中文字体支持"""
+        """设置中文字体支持（每个进程只注册一次）"""
+        global _CHINESE_FONT
+        if _CHINESE_FONT:
+            self.chinese_font = _CHINESE_FONT
+            return
         try:
             chinese_fonts = [
                 ('SimSun', 'C:/Windows/Fonts/simsun.ttc'),
@@ -324,10 +544,10 @@ class EnhancedOneNoteContentParser:
                     try:
                         pdfmetrics.registerFont(TTFont(font_name, font_path))
                         self.chinese_font = font_name
-                        self.logger.info(f"成功注册中文字体: {font_name}")
+                        self.logger.info("成功注册中文字体: %s", font_name)
                         break
                     except Exception as e:
-                        self.logger.debug(f"注册字体{font_name}失败: {e}")
+                        self.logger.debug("注册字体%s失败: %s", font_name, e)
                         continue
             
             if not self.chinese_font:
@@ -336,82 +556,143 @@ class EnhancedOneNoteContentParser:
                 
         except Exception as e:
             self.chinese_font = 'Helvetica'
-            self.logger.error(f"字体设置失败: {e}")
+            self.logger.error("字体设置失败: %s", e)
+        _CHINESE_FONT = self.chinese_font
+    
+    def _setup_pdf_styles(self):
+        """创建PDF样式（字体确定后只需创建一次，所有页面共用）"""
+        styles = getSampleStyleSheet()
+        
+        self._pdf_title_style = ParagraphStyle(
+            'ChineseTitle',
+            parent=styles['Heading1'],
+            fontSize=18,
+            alignment=TA_CENTER,
+            fontName=self.chinese_font,
+            textColor=colors.black,
+            spaceAfter=12
+        )
+        
+        self._pdf_normal_style = ParagraphStyle(
+            'ChineseNormal',
+            parent=styles['Normal'],
+            fontSize=12,
+            fontName=self.chinese_font,
+            textColor=colors.black,
+            leftIndent=0,
+            rightIndent=0,
+            spaceAfter=6
+        )
+        
+        self._pdf_table_cell_style = ParagraphStyle(
+            'TableCell',
+            parent=self._pdf_normal_style,
+            fontSize=9,
+            leading=11,
+            fontName=self.chinese_font,
+            leftIndent=2,
+            rightIndent=2,
+            spaceAfter=2,
+            spaceBefore=2
+        )
+        
+        self._indent_styles: Dict[int, ParagraphStyle] = {}  # 缩进级别 -> 正文样式
+        
+        self._pdf_table_style = TableStyle([
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('FONTNAME', (0, 0), (-1, -1), self.chinese_font),
+            ('LEFTPADDING', (0, 0), (-1, -1), 2),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 2),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ])
     
     def cleanup_temp_files(self):
         """清理临时文件"""
+        self.release_page_files()
+        if self._img_dir and self._tmpdir is None:
+            shutil.rmtree(self._img_dir, ignore_errors=True)
+        self._img_dir = None
+
+    def set_tmpdir(self, tmpdir: Optional[Path]):
+        """指定图片临时目录，由调用方的TemporaryDirectory负责清理；None表示自行创建"""
+        self.cleanup_temp_files()
+        self._tmpdir = tmpdir
+
+    def release_page_files(self):
+        """只删除已登记的临时图片文件，保留临时目录供后续页面继续使用"""
         for temp_file in self.temp_files:
             try:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-            except Exception as e:
-                self.logger.debug(f"清理临时文件失败: {e}")
+                os.remove(temp_file)
+            except OSError as e:
+                self.logger.debug("清理临时文件失败: %s", e)
         self.temp_files.clear()
-
-    def _findall_local(self, parent: ET.Element, local_name: str) -> List[ET.Element]:
-        """命名空间无关的元素查找"""
-        out=[]
-        for el in parent.iter():
-            tag = el.tag
-            if isinstance(tag,str) and (tag.endswith('}'+local_name) or tag==local_name or tag.split('}')[-1]==local_name):
-                if el is not parent or tag.split('}')[-1] != local_name:
-                    out.append(el)
-        return out
-
-    def _is_inside_element(self, element: ET.Element, target_elements: List[str]) -> bool:
-        """检查元素是否位于指定元素内部"""
-        current = element
-        while current is not None:
-            tag_name = current.tag
-            if isinstance(tag_name, str):
-                for target in target_elements:
-                    if (tag_name.endswith('}'+target) or tag_name == target):
-                        return True
-            current = current.getparent() if hasattr(current, 'getparent') else None
-        return False
+        self._image_cache.clear()
+
+    @staticmethod
+    def _image_key(data: bytes) -> bytes:
+        """图片内容哈希，用于去重与尺寸缓存"""
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def _temp_image_file(self, data: bytes, format_ext: str, key: Optional[bytes] = None) -> str:
+        """将图片写入临时文件；内容相同的图片复用同一文件"""
+        if key is None:
+            key = self._image_key(data)
+        temp_img = self._image_cache.get(key)
+        if temp_img is None:
+            if self._img_dir is None:
+                self._img_dir = (str(self._tmpdir) if self._tmpdir is not None
+                                 else tempfile.mkdtemp(prefix='onenote_img_', dir=app_temp_root()))
+            with tempfile.NamedTemporaryFile(suffix=format_ext, delete=False, dir=self._img_dir) as tf:
+                tf.write(data)
+                temp_img = tf.name
+            self.temp_files.append(temp_img)
+            self._image_cache[key] = temp_img
+        return temp_img
 
     def _extract_image_data_enhanced(self, img_elem: ET.Element) -> Optional[Tuple[bytes, str]]:
         """增强的图片数据提取，支持多种格式和属性"""
         
-        # 扩展的属性列表
-        image_attributes = [
-            'data', 'Data', 'binaryData', 'base64Data', 'imageData',
-            'src', 'source', 'content', 'bytes', 'binary'
-        ]
-        
-        # 1. 从元素属性中提取
-        for attr in image_attributes:
-            value = img_elem.get(attr)
-            if value:
+        # 1. 从元素属性中提取（没有任何候选属性时整体跳过）
+        attrib = img_elem.attrib
+        for attr in ([] if self._image_attr_set.isdisjoint(attrib) else self._image_attributes):
+            value = attrib.get(attr)
+            # 约136个base64字符才对应100字节，明显不是base64的值不必尝试解码
+            if value and len(value) >= 136 and self._looks_like_base64(value):
                 try:
                     data = base64.b64decode(value)
                     if len(data) > 100:  # 有效的图片数据应该大于100字节
                         format_ext = self._detect_image_format(data)
-                        self.logger.debug(f"从属性 {attr} 提取到图片数据: {len(data)} bytes, 格式: {format_ext}")
+                        self.logger.debug("从属性 %s 提取到图片数据: %s bytes, 格式: %s", attr, len(data), format_ext)
                         return data, format_ext
                 except Exception as e:
-                    self.logger.debug(f"解码属性 {attr} 失败: {e}")
+                    self.logger.debug("解码属性 %s 失败: %s", attr, e)
                     continue
         
         # 2. 从子元素中提取
+        tried = []
         for child in img_elem:
             if child.text:
                 # 检查子元素标签
                 tag = child.tag
                 if isinstance(tag, str) and any(keyword in tag.lower() for keyword in ['data', 'binary', 'content']):
+                    tried.append(child)
                     try:
                         data = base64.b64decode(child.text)
                         if len(data) > 100:
                             format_ext = self._detect_image_format(data)
-                            self.logger.debug(f"从子元素 {tag} 提取到图片数据: {len(data)} bytes, 格式: {format_ext}")
+                            self.logger.debug("从子元素 %s 提取到图片数据: %s bytes, 格式: %s", tag, len(data), format_ext)
                             return data, format_ext
                     except Exception as e:
-                        self.logger.debug(f"解码子元素 {tag} 失败: {e}")
+                        self.logger.debug("解码子元素 %s 失败: %s", tag, e)
                         continue
         
-        # 3. 递归搜索所有后代元素
+        # 3. 递归搜索所有后代元素（跳过第2步已解码失败的子元素）
         for descendant in img_elem.iter():
-            if descendant != img_elem and descendant.text:
+            if descendant is not img_elem and descendant.text and descendant not in tried:
                 # 尝试解析任何可能包含base64数据的文本
                 text = descendant.text.strip()
                 if len(text) > 100 and self._looks_like_base64(text):
@@ -419,7 +700,7 @@ class EnhancedOneNoteContentParser:
                         data = base64.b64decode(text)
                         if len(data) > 100:
                             format_ext = self._detect_image_format(data)
-                            self.logger.debug(f"从后代元素递归提取到图片数据: {len(data)} bytes, 格式: {format_ext}")
+                            self.logger.debug("从后代元素递归提取到图片数据: %s bytes, 格式: %s", len(data), format_ext)
                             return data, format_ext
                     except Exception:
                         continue
@@ -431,36 +712,98 @@ class EnhancedOneNoteContentParser:
         """检查文本是否看起来像base64编码"""
         if len(text) < 100:  # 太短的不太可能是图片
             return False
-        # base64字符集检查
-        import string
-        valid_chars = string.ascii_letters + string.digits + '+/='
-        return all(c in valid_chars for c in text[:100])  # 只检查前100个字符以提高效率
+        # base64字符集检查，只检查开头部分以提高效率
+        return _RE_B64.match(text, 0, 256) is not None
     
     def _detect_image_format(self, data: bytes) -> str:
         """检测图片格式"""
-        for signature, ext in self.supported_image_extensions.items():
-            if data.startswith(signature):
-                return ext
-        
-        # 额外检查WEBP（RIFF格式的特殊情况）
-        if data.startswith(b'RIFF') and b'WEBP' in data[:12]:
+        # 先检查WEBP（RIFF格式的特殊情况）
+        if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
             return '.webp'
         
+        # 一次startswith调用排除所有未知签名
+        if data.startswith(self._sig_tuple):
+            for signature, ext in self._sig_map:
+                if data.startswith(signature):
+                    return ext
+        
         return '.png'  # 默认使用PNG格式
 
+    @staticmethod
+    def _image_size(data: bytes) -> Optional[Tuple[int, int]]:
+        """直接读取PNG/GIF/BMP/JPEG/WebP文件头获取(宽, 高)，无法识别时返回None"""
+        try:
+            if data[:8] == b'\x89PNG\r\n\x1a\n':
+                w, h = struct.unpack('>II', data[16:24])
+            elif data[:6] in (b'GIF87a', b'GIF89a'):
+                w, h = struct.unpack('<HH', data[6:10])
+            elif data[:2] == b'BM':
+                w, h = struct.unpack('<ii', data[18:26])
+            elif data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+                chunk = data[12:16]
+                if chunk == b'VP8 ':
+                    w, h = struct.unpack('<HH', data[26:30])
+                    w, h = w & 0x3FFF, h & 0x3FFF
+                elif chunk == b'VP8L':
+                    bits = int.from_bytes(data[21:25], 'little')
+                    w, h = (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+                elif chunk == b'VP8X':
+                    w = int.from_bytes(data[24:27], 'little') + 1
+                    h = int.from_bytes(data[27:30], 'little') + 1
+                else:
+                    return None
+            elif data[:2] == b'\xff\xd8':
+                # 扫描JPEG段，找到SOFn帧头
+                i, n = 2, len(data)
+                while i + 9 < n:
+                    if data[i] != 0xFF:
+                        i += 1
+                        continue
+                    marker = data[i+1]
+                    if marker == 0xFF:
+                        i += 1
+                    elif 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                        h, w = struct.unpack('>HH', data[i+5:i+9])
+                        break
+                    elif marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                        i += 2
+                    else:
+                        i += 2 + struct.unpack('>H', data[i+2:i+4])[0]
+                else:
+                    return None
+            else:
+                return None
+        except struct.error:
+            return None
+        w, h = abs(w), abs(h)
+        return (w, h) if w and h else None
+    
+    def _get_image_size(self, data: bytes) -> Optional[Tuple[int, int]]:
+        """获取图片尺寸：优先解析文件头，必要时回退到PIL；没有PIL时返回None"""
+        size = self._image_size(data)
+        if size:
+            return size
+        try:
+            from PIL import Image as PILImage
+        except ImportError:
+            return None
+        # PIL也无法识别时按未知尺寸处理，由调用方使用默认宽度插入
+        try:
+            with PILImage.open(io.BytesIO(data)) as pil_img:
+                return pil_img.size
+        except Exception:
+            return None
+    
     def _extract_table_data_enhanced(self, table_elem: ET.Element) -> List[List[str]]:
         """增强的表格数据提取，处理复杂结构和避免重复"""
         rows = []
         seen_row_signatures = set()  # 用于去重
         
         # 查找所有行元素
-        row_elements = self._findall_local(table_elem, 'Row')
-        
-        for row_elem in row_elements:
-            cell_elements = self._findall_local(row_elem, 'Cell')
+        for row_elem in iter_local(table_elem, 'Row'):
             row_data = []
             
-            for cell_elem in cell_elements:
+            for cell_elem in iter_local(row_elem, 'Cell'):
                 # 使用增强的单元格文本提取
                 cell_text = self._extract_cell_text_enhanced(cell_elem)
                 
@@ -482,9 +825,10 @@ class EnhancedOneNoteContentParser:
             if row_data and any(cell.strip() for cell in row_data) and row_signature not in seen_row_signatures:
                 seen_row_signatures.add(row_signature)
                 rows.append(row_data)
-                self.logger.debug(f"提取表格行: {len(row_data)} 个单元格")
+                self.logger.debug("提取表格行: %s 个单元格", len(row_data))
         
-        self.logger.info(f"表格数据提取完成: {len(rows)} 行, 最大列数: {max(len(row) for row in rows) if rows else 0}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("表格数据提取完成: %s 行, 最大列数: %s", len(rows), max(len(row) for row in rows) if rows else 0)
         return rows
     
     def _get_cell_span(self, cell_elem: ET.Element, span_type: str) -> int:
@@ -501,41 +845,17 @@ class EnhancedOneNoteContentParser:
     
     def _extract_cell_text_enhanced(self, cell_elem: ET.Element) -> str:
         """增强的单元格文本提取，处理嵌套内容"""
-        text_parts = []
-        seen_texts = set()
-        
-        # 1. 查找所有文本元素（T元素）
-        for t_elem in self._findall_local(cell_elem, 'T'):
-            if t_elem.text:
-                clean_text = self._clean_text_content(t_elem.text)
-                if clean_text and clean_text not in seen_texts:
-                    seen_texts.add(clean_text)
-                    text_parts.append(clean_text)
-        
-        # 2. 如果没有找到T元素，递归提取所有文本内容
-        if not text_parts:
-            def collect_text_recursive(elem):
-                if elem.text and elem.text.strip():
-                    clean_text = self._clean_text_content(elem.text)
-                    if clean_text and clean_text not in seen_texts:
-                        seen_texts.add(clean_text)
-                        text_parts.append(clean_text)
-                
-                for child in elem:
-                    collect_text_recursive(child)
-                    if child.tail and child.tail.strip():
-                        clean_text = self._clean_text_content(child.tail)
-                        if clean_text and clean_text not in seen_texts:
-                            seen_texts.add(clean_text)
-                            text_parts.append(clean_text)
-            
-            collect_text_recursive(cell_elem)
+        clean = self._clean_text_content
+        
+        # 1. 查找所有文本元素（T元素），保留OneNote原本的文本分组
+        texts = [clean(t.text) for t in iter_local(cell_elem, 'T') if t.text]
         
-        # 3. 合并文本，保持适当的间距
-        result = ' '.join(text_parts)
-        result = re.sub(r'\s+', ' ', result).strip()
+        # 2. 如果没有找到T元素，由itertext在C层遍历全部文本
+        if not any(texts):
+            texts = [clean(t) for t in cell_elem.itertext() if t.strip()]
         
-        return result
+        # 3. 有序去重后合并；split()顺带折叠空白，一次完成拼接与规范化
+        return ' '.join(w for t in dict.fromkeys(texts) for w in t.split())
     
     def _clean_text_content(self, text: str) -> str:
         """清理文本内容"""
@@ -545,45 +865,89 @@ class EnhancedOneNoteContentParser:
         # HTML解码
         text = html.unescape(text)
         # 移除HTML标签
-        text = re.sub(r'<[^>]+>', '', text)
-        # 处理特殊字符
-        text = text.replace('\u2022', '•').replace('\u2013', '-').replace('\u2014', '—')
-        text = text.replace('\u201c', '"').replace('\u201d', '"')
-        text = text.replace('\u2018', "'").replace('\u2019', "'")
+        text = _RE_TAG.sub('', text)
+        # 处理特殊字符（一次translate完成全部单字符替换）
+        text = text.translate(_SPECIAL_CHARS)
         # 清理空白字符
-        text = re.sub(r'[\t\x0b\x0c]+', ' ', text)
+        text = _RE_TABWS.sub(' ', text)
         text = text.strip()
         
         return text
 
     def _process_content_in_original_order(self, root: ET.Element, processor_func, *args) -> None:
         """按照XML中的原始顺序处理所有内容元素"""
-        
-        def process_element(elem: ET.Element, depth: int = 0):
-            """深度优先遍历处理元素"""
+        # 单次线性遍历；进入/离开表格时维护深度计数，无需逐节点回溯祖先
+        in_table = 0
+        for event, elem in iterwalk(root, _CONTENT_TAGS):
             tag_name = elem.tag
-            if not isinstance(tag_name, str):
-                return
+            if elem is root or not isinstance(tag_name, str):
+                continue
             
             # 获取标签的本地名称
-            local_name = tag_name.split('}')[-1] if '}' in tag_name else tag_name
+            local_name = localname(tag_name)
             
             # 根据元素类型调用对应的处理器
             if local_name == 'Table':
-                processor_func('table', elem, *args)
+                if event == 'start':
+                    processor_func('table', elem, *args)
+                    in_table += 1
+                else:
+                    in_table -= 1
+            elif event == 'end':
+                continue
             elif local_name == 'Image':  
                 processor_func('image', elem, *args)
-            elif local_name in ['OE', 'T'] and not self._is_inside_element(elem, ['Table']):
+            elif local_name in ('OE', 'T') and not in_table:
                 # 文本元素，但不在表格内
                 processor_func('text', elem, *args)
-            
-            # 递归处理子元素
-            for child in elem:
-                process_element(child, depth + 1)
-        
-        # 从根元素开始处理
-        for child in root:
-            process_element(child)
+
+    # === 中间表示 ===
+    def parse_page(self, xml: str, include_images: bool = True) -> List[Tuple]:
+        """解析页面XML为按原始顺序排列的内容块，Word与PDF渲染共用同一份解析结果"""
+        blocks: List[Tuple] = []
+        self._process_content_in_original_order(parse_xml(xml), self._collect_block,
+                                                blocks, include_images)
+        return blocks
+    
+    def _collect_block(self, element_type: str, element: ET.Element,
+                       blocks: List, include_images: bool):
+        """内容块：('table', 行数据) / ('image', 临时文件, 内容哈希, 原始尺寸) / ('text', 文本, 缩进级别, 格式)"""
+        try:
+            if element_type == 'table':
+                rows_data = self._extract_table_data_enhanced(element)
+                if rows_data:
+                    blocks.append(('table', rows_data))
+            elif element_type == 'image' and include_images:
+                image_data = self._extract_image_data_enhanced(element)
+                if image_data:
+                    # 解码后的图片立即落盘，块中只保留路径，避免整页图片常驻内存
+                    data, format_ext = image_data
+                    key = self._image_key(data)
+                    blocks.append(('image', self._temp_image_file(data, format_ext, key), key,
+                                   self._get_image_size(data)))
+            elif element_type == 'text':
+                raw = element.text
+                if not raw or raw.isspace():
+                    return
+                text = self._clean_text_content(raw)
+                if text.strip():
+                    blocks.append(('text', text, self._get_text_indent_level(element),
+                                   self._text_format(element)))
+        except Exception as e:
+            self.logger.warning("解析%s元素失败: %s", element_type, e)
+    
+    def _text_format(self, elem: ET.Element) -> Tuple:
+        """提取文本格式：(粗体, 斜体, 下划线, 字号)"""
+        tag = elem.tag.lower()
+        font_size = elem.get('fontSize')
+        try:
+            size = float(font_size) if font_size else None
+        except (ValueError, TypeError):
+            size = None
+        return (elem.get('bold') == 'true' or 'bold' in tag,
+                elem.get('italic') == 'true' or 'italic' in tag,
+                elem.get('underline') == 'true' or 'underline' in tag,
+                size)
 
     # === Word处理方法 ===
     def parse_page_to_docx(self, xml: str, page_name: str, out_path: str,
@@ -591,40 +955,70 @@ class EnhancedOneNoteContentParser:
                            embed_attachments=False,
                            attachments_output_dir: Optional[Path]=None) -> bool:
         try:
-            root = ET.fromstring(xml)
-            doc = Document()
+            blocks = self.parse_page(xml, include_images)
+        except Exception as e:
+            self.logger.error('DOCX生成失败: %s', e)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                traceback.print_exc()
+            return False
+        return self.render_docx(blocks, page_name, out_path, include_images)
+    
+    def render_docx(self, blocks: List[Tuple], page_name: str, out_path: str,
+                    include_images: bool = True) -> bool:
+        """把内容块渲染为Word文档"""
+        try:
+            doc = self._new_document()
             doc.add_heading(page_name, level=1).alignment = WD_ALIGN_PARAGRAPH.CENTER
 
-            # 按原始顺序处理内容
-            self._process_content_in_original_order(root, self._word_content_processor, 
-                                                    doc, include_images)
+            # 文本段落先攒在pending中，批量插入文档
+            pending: List = []
+            for block in blocks:
+                self._word_content_processor(block, doc, include_images, pending)
+            self._flush_word_paragraphs(doc, pending)
 
             doc.save(out_path)
             return True
         except Exception as e:
-            self.logger.error(f'DOCX生成失败: {e}')
-            traceback.print_exc()
+            self.logger.error('DOCX生成失败: %s', e)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                traceback.print_exc()
             return False
     
-    def _word_content_processor(self, element_type: str, element: ET.Element, 
-                               doc: Document, include_images: bool):
+    def _new_document(self) -> Document:
+        """从内存中的模板字节创建新文档，避免每页重新定位并读取默认模板"""
+        if self._docx_template is None:
+            buf = io.BytesIO()
+            Document().save(buf)
+            self._docx_template = buf.getvalue()
+        return Document(io.BytesIO(self._docx_template))
+    
+    def _word_content_processor(self, block: Tuple, doc: Document,
+                               include_images: bool, pending: List):
         """Word内容处理器"""
+        element_type = block[0]
         try:
             if element_type == 'table':
-                self._process_table_for_word(element, doc)
+                self._flush_word_paragraphs(doc, pending)
+                self._process_table_for_word(block[1], doc)
             elif element_type == 'image' and include_images:
-                self._process_image_for_word(element, doc)  
+                self._flush_word_paragraphs(doc, pending)
+                self._process_image_for_word(block[1], block[3], doc)
             elif element_type == 'text':
-                self._process_text_for_word(element, doc)
+                self._process_text_for_word(block[1], block[2], block[3], pending)
         except Exception as e:
-            self.logger.warning(f"处理{element_type}元素失败: {e}")
+            self.logger.warning("处理%s元素失败: %s", element_type, e)
     
-    def _process_table_for_word(self, table_elem: ET.Element, doc: Document):
-        """处理Word表格"""
-        rows_data = self._extract_table_data_enhanced(table_elem)
-        if not rows_data:
+    def _flush_word_paragraphs(self, doc: Document, pending: List):
+        """把攒下的段落一次性插入到正文末尾（sectPr之前）"""
+        if not pending:
             return
-            
+        body = doc.element.body
+        pos = body.index(body.sectPr) if body.sectPr is not None else len(body)
+        body[pos:pos] = pending
+        pending.clear()
+    
+    def _process_table_for_word(self, rows_data: List[List[str]], doc: Document):
+        """处理Word表格"""
         max_cols = max(len(row) for row in rows_data) if rows_data else 1
         max_rows = len(rows_data)
         
@@ -649,45 +1043,29 @@ class EnhancedOneNoteContentParser:
             doc.add_paragraph()  # 表格后添加空行
             
         except Exception as e:
-            self.logger.warning(f"创建Word表格失败: {e}")
+            self.logger.warning("创建Word表格失败: %s", e)
     
-    def _process_image_for_word(self, img_elem: ET.Element, doc: Document):
+    def _process_image_for_word(self, image_path: str, size: Optional[Tuple[int, int]], doc: Document):
         """处理Word图片"""
-        image_data = self._extract_image_data_enhanced(img_elem)
-        if not image_data:
-            return
-            
-        data, format_ext = image_data
-        
-        # 创建临时图片文件
-        temp_img = tempfile.mktemp(suffix=format_ext)
-        self.temp_files.append(temp_img)
-        
         try:
-            Path(temp_img).write_bytes(data)
-            
-            # 智能调整图片尺寸
-            display_width = self._calculate_word_image_width(data)
-            doc.add_picture(temp_img, width=Inches(display_width))
+            # 智能调整图片尺寸；python-docx按内容去重图片部件
+            display_width = self._calculate_word_image_width(size)
+            doc.add_picture(image_path, width=Inches(display_width))
             doc.add_paragraph()
             
-            self.logger.debug(f"添加Word图片成功: {len(data)} bytes, 宽度: {display_width}英寸")
+            self.logger.debug("添加Word图片成功: %s, 宽度: %s英寸", image_path, display_width)
             
         except Exception as e:
-            self.logger.warning(f"添加Word图片失败: {e}")
+            self.logger.warning("添加Word图片失败: %s", e)
     
-    def _calculate_word_image_width(self, image_data: bytes) -> float:
+    def _calculate_word_image_width(self, size: Optional[Tuple[int, int]]) -> float:
         """计算Word文档中的图片显示宽度"""
         try:
-            # 尝试获取图片尺寸
-            try:
-                from PIL import Image as PILImage
-                import io
-                with PILImage.open(io.BytesIO(image_data)) as pil_img:
-                    orig_width, orig_height = pil_img.size
-                    aspect_ratio = orig_height / orig_width
-            except ImportError:
-                # 没有PIL时使用默认比例
+            if size:
+                orig_width, orig_height = size
+                aspect_ratio = orig_height / orig_width
+            else:
+                # 无法获取尺寸时使用默认比例
                 aspect_ratio = 0.75
                 orig_width = 800
             
@@ -718,246 +1096,207 @@ class EnhancedOneNoteContentParser:
         except Exception:
             return 4.0  # 默认宽度
     
-    def _process_text_for_word(self, text_elem: ET.Element, doc: Document):
-        """处理Word文本"""
-        if text_elem.text:
-            text = self._clean_text_content(text_elem.text)
-            if text.strip():
-                p = doc.add_paragraph()
-                
-                # 获取缩进级别
-                indent_level = self._get_text_indent_level(text_elem)
-                if indent_level > 0:
-                    p.paragraph_format.left_indent = Inches(indent_level * 0.25)
-                
-                # 添加文本运行并应用格式
-                run = p.add_run(text)
-                self._apply_text_formatting_word(text_elem, run)
+    def _process_text_for_word(self, text: str, indent_level: int, fmt: Tuple, pending: List):
+        """处理Word文本：直接构造<w:p>元素，绕开add_paragraph/add_run的对象开销"""
+        p = OxmlElement('w:p')
+        
+        # 缩进级别（0.25英寸 = 360缇）
+        if indent_level > 0:
+            ppr = OxmlElement('w:pPr')
+            ind = OxmlElement('w:ind')
+            ind.set(qn('w:left'), str(indent_level * 360))
+            ppr.append(ind)
+            p.append(ppr)
+        
+        # 添加文本运行并应用格式，制表符转为<w:tab/>、换行转为<w:br/>
+        r = OxmlElement('w:r')
+        rpr = self._word_run_properties(fmt)
+        if rpr is not None:
+            r.append(rpr)
+        for piece in _RE_WORD_BREAKS.split(text):
+            if not piece:
+                continue
+            if piece == '\t':
+                r.append(OxmlElement('w:tab'))
+            elif piece in ('\n', '\r', '\r\n'):
+                r.append(OxmlElement('w:br'))
+            else:
+                t = OxmlElement('w:t')
+                t.set(qn('xml:space'), 'preserve')
+                t.text = piece
+                r.append(t)
+        p.append(r)
+        pending.append(p)
     
     def _get_text_indent_level(self, text_elem: ET.Element) -> int:
         """获取文本缩进级别"""
-        # 查找父级List元素
-        current = text_elem
-        while current is not None:
-            if hasattr(current, 'getparent'):
-                parent = current.getparent()
-                if parent is not None:
-                    tag_name = parent.tag
-                    if isinstance(tag_name, str) and (tag_name.endswith('}List') or tag_name == 'List'):
-                        try:
-                            return int(parent.get('indent', '0'))
-                        except (ValueError, TypeError):
-                            return 0
-                current = parent
-            else:
-                break
+        # 查找父级List元素（标准库元素没有父指针）
+        if not LXML_AVAILABLE:
+            return 0
+        for parent in text_elem.iterancestors():
+            if localname(parent.tag) == 'List':
+                try:
+                    return int(parent.get('indent', '0'))
+                except (ValueError, TypeError):
+                    return 0
         return 0
     
-    def _apply_text_formatting_word(self, elem: ET.Element, run):
-        """应用Word文本格式"""
+    def _word_run_properties(self, fmt: Tuple):
+        """根据文本格式(粗体, 斜体, 下划线, 字号)生成<w:rPr>，无格式时返回None"""
         try:
-            # 检查格式属性
-            if elem.get('bold') == 'true' or 'bold' in elem.tag.lower():
-                run.bold = True
-            if elem.get('italic') == 'true' or 'italic' in elem.tag.lower():
-                run.italic = True
-            if elem.get('underline') == 'true' or 'underline' in elem.tag.lower():
-                run.underline = True
-            
-            # 字体大小
-            font_size = elem.get('fontSize')
+            bold, italic, underline, font_size = fmt
+            rpr = OxmlElement('w:rPr')
+            # 子元素顺序需符合schema：b, i, sz, u
+            if bold:
+                rpr.append(OxmlElement('w:b'))
+            if italic:
+                rpr.append(OxmlElement('w:i'))
+            
+            # 字体大小（以半磅为单位）
             if font_size:
-                try:
-                    run.font.size = Pt(float(font_size))
-                except (ValueError, TypeError):
-                    pass
+                sz = OxmlElement('w:sz')
+                sz.set(qn('w:val'), str(int(round(font_size * 2))))
+                rpr.append(sz)
+            
+            if underline:
+                u = OxmlElement('w:u')
+                u.set(qn('w:val'), 'single')
+                rpr.append(u)
+            
+            return rpr if len(rpr) else None
                     
         except Exception as e:
-            self.logger.debug(f"应用Word格式失败: {e}")
+            self.logger.debug("应用Word格式失败: %s", e)
+            return None
 
     # === PDF处理方法 ===
     def parse_page_to_pdf(self, xml: str, page_name: str, out_path: str,
                           include_images=True, include_attachments=True,
                           attachments_output_dir: Optional[Path]=None) -> bool:
         try:
-            root = ET.fromstring(xml)
-            
-            # 创建自定义样式，支持中文
-            styles = getSampleStyleSheet()
-            
-            title_style = ParagraphStyle(
-                'ChineseTitle',
-                parent=styles['Heading1'],
-                fontSize=18,
-                alignment=TA_CENTER,
-                fontName=self.chinese_font,
-                textColor=colors.black,
-                spaceAfter=12
-            )
-            
-            normal_style = ParagraphStyle(
-                'ChineseNormal',
-                parent=styles['Normal'],
-                fontSize=12,
-                fontName=self.chinese_font,
-                textColor=colors.black,
-                leftIndent=0,
-                rightIndent=0,
-                spaceAfter=6
-            )
+            blocks = self.parse_page(xml, include_images)
+        except Exception as e:
+            self.logger.error('PDF生成失败: %s', e)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                traceback.print_exc()
+            return False
+        return self.render_pdf(blocks, page_name, out_path, include_images)
+    
+    def render_pdf(self, blocks: List[Tuple], page_name: str, out_path: str,
+                   include_images: bool = True) -> bool:
+        """把内容块渲染为PDF文档"""
+        try:
+            # 使用预先创建的中文样式
+            title_style = self._pdf_title_style
+            normal_style = self._pdf_normal_style
             
             # 创建文档
-            doc = SimpleDocTemplate(
-                out_path, 
-                pagesize=A4,
-                leftMargin=1.5*cm,
-                rightMargin=1.5*cm,
-                topMargin=2*cm,
-                bottomMargin=2*cm
-            )
+            doc = self._make_pdf_doc(out_path)
             
             story = []
             story.append(Paragraph(page_name, title_style))
             story.append(Spacer(1, 12))
 
-            # 按原始顺序处理内容
-            self._process_content_in_original_order(root, self._pdf_content_processor, 
-                                                    story, normal_style, include_images)
+            for block in blocks:
+                self._pdf_content_processor(block, story, normal_style, include_images)
 
-            doc.build(story)
+            # 样式/流对象均已确定，构建期间关闭ReportLab的逐属性校验
+            shape_checking = rl_config.shapeChecking
+            rl_config.shapeChecking = 0
+            try:
+                doc.build(story)
+            finally:
+                rl_config.shapeChecking = shape_checking
             return True
         except Exception as e:
-            self.logger.error(f'PDF生成失败: {e}')
-            traceback.print_exc()
+            self.logger.error('PDF生成失败: %s', e)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                traceback.print_exc()
             return False
     
-    def _pdf_content_processor(self, element_type: str, element: ET.Element,
-                              story: List, normal_style: ParagraphStyle, include_images: bool):
+    def _make_pdf_doc(self, out_path: str) -> BaseDocTemplate:
+        """创建A4文档，复用预先构建的正文框（框在排版时有状态，故每个文档一份浅拷贝）"""
+        doc = BaseDocTemplate(out_path, pagesize=A4, **_PDF_MARGINS)
+        doc.addPageTemplates([PageTemplate(id='Normal', frames=[copy.copy(_PDF_FRAME)])])
+        return doc
+    
+    def _pdf_content_processor(self, block: Tuple, story: List,
+                              normal_style: ParagraphStyle, include_images: bool):
         """PDF内容处理器"""
+        element_type = block[0]
         try:
             if element_type == 'table':
-                self._process_table_for_pdf(element, story, normal_style)
+                self._process_table_for_pdf(block[1], story, normal_style)
             elif element_type == 'image' and include_images:
-                self._process_image_for_pdf(element, story)
+                self._process_image_for_pdf(block[1], block[2], block[3], story)
             elif element_type == 'text':
-                self._process_text_for_pdf(element, story, normal_style)
+                self._process_text_for_pdf(block[1], block[2], story, normal_style)
         except Exception as e:
-            self.logger.warning(f"处理PDF {element_type}元素失败: {e}")
+            self.logger.warning("处理PDF %s元素失败: %s", element_type, e)
     
-    def _process_table_for_pdf(self, table_elem: ET.Element, story: List, normal_style: ParagraphStyle):
+    def _process_table_for_pdf(self, rows_data: List[List[str]], story: List, normal_style: ParagraphStyle):
         """处理PDF表格"""
-        rows_data = self._extract_table_data_enhanced(table_elem)
-        if not rows_data:
-            return
-            
-        # 创建表格样式
-        cell_style = ParagraphStyle(
-            'TableCell',
-            parent=normal_style,
-            fontSize=9,
-            leading=11,
-            fontName=normal_style.fontName,
-            leftIndent=2,
-            rightIndent=2,
-            spaceAfter=2,
-            spaceBefore=2
-        )
+        # 共用预先创建的表格样式
+        cell_style = self._pdf_table_cell_style
         
-        max_cols = max(len(row) for row in rows_data) if rows_data else 1
+        max_cols = max(map(len, rows_data))
         
-        # 补齐行数据
-        normalized_rows = []
-        for row in rows_data:
-            normalized_row = row + [''] * (max_cols - len(row))
-            normalized_rows.append(normalized_row)
+        # 补齐行数据（已满列的行直接复用）
+        normalized_rows = [row + [''] * (max_cols - len(row)) if len(row) < max_cols else row
+                           for row in rows_data]
         
         try:
-            # 转换为Paragraph对象
-            table_flow = []
-            for row in normalized_rows:
-                flow_row = []
-                for cell_text in row:
-                    # 限制单元格文本长度
-                    if len(cell_text) > 150:
-                        cell_text = cell_text[:147] + '...'
-                    para = Paragraph(cell_text or ' ', cell_style)
-                    flow_row.append(para)
-                table_flow.append(flow_row)
+            # 转换为Paragraph对象，限制单元格文本长度
+            _P = Paragraph
+            table_flow = [[_P(c if 0 < (n := len(c)) <= _CELL_LIMIT else (c[:_CELL_TRUNC] + _ELLIPSIS if n else ' '),
+                              cell_style) for c in row]
+                          for row in normalized_rows]
             
             if table_flow:
                 # 计算合适的列宽
-                available_width = A4[0] - 3*cm
-                col_width = available_width / max_cols
-                col_width = max(col_width, 1.2*cm)  # 最小列宽
+                col_width = max(_PAGE_W_USABLE / max_cols, _MIN_COL_W)  # 最小列宽
                 col_widths = [col_width] * max_cols
                 
                 pdf_table = Table(table_flow, colWidths=col_widths)
-                
-                table_style = TableStyle([
-                    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 8),
-                    ('FONTNAME', (0, 0), (-1, -1), normal_style.fontName),
-                    ('LEFTPADDING', (0, 0), (-1, -1), 2),
-                    ('RIGHTPADDING', (0, 0), (-1, -1), 2),
-                    ('TOPPADDING', (0, 0), (-1, -1), 2),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-                ])
-                
-                pdf_table.setStyle(table_style)
+                pdf_table.setStyle(self._pdf_table_style)
                 
                 story.append(Spacer(1, 6))
                 story.append(pdf_table)
                 story.append(Spacer(1, 12))
                 
-                self.logger.debug(f"添加PDF表格成功: {len(normalized_rows)}行 x {max_cols}列")
+                self.logger.debug("添加PDF表格成功: %s行 x %s列", len(normalized_rows), max_cols)
                 
         except Exception as e:
-            self.logger.warning(f"PDF表格渲染失败: {e}")
+            self.logger.warning("PDF表格渲染失败: %s", e)
     
-    def _process_image_for_pdf(self, img_elem: ET.Element, story: List):
+    def _process_image_for_pdf(self, image_path: str, key: bytes,
+                               size: Optional[Tuple[int, int]], story: List):
         """处理PDF图片"""
-        image_data = self._extract_image_data_enhanced(img_elem)
-        if not image_data:
-            return
-            
-        data, format_ext = image_data
-        
-        # 创建临时图片文件
-        temp_img = tempfile.mktemp(suffix=format_ext)
-        self.temp_files.append(temp_img)
-        
         try:
-            Path(temp_img).write_bytes(data)
+            # 计算合适的显示尺寸，重复出现的图片直接取缓存
+            dims = self._image_dim_cache.get(key)
+            if dims is None:
+                dims = self._image_dim_cache[key] = self._calculate_pdf_image_size(size)
+            width, height = dims
             
-            # 计算合适的显示尺寸
-            width, height = self._calculate_pdf_image_size(data)
-            
-            img = RLImage(temp_img, width=width, height=height)
+            img = RLImage(image_path, width=width, height=height)
             story.append(Spacer(1, 8))
             story.append(img)
             story.append(Spacer(1, 12))
             
-            self.logger.debug(f"添加PDF图片成功: {len(data)} bytes, 尺寸: {width}x{height}")
+            self.logger.debug("添加PDF图片成功: %s, 尺寸: %sx%s", image_path, width, height)
             
         except Exception as e:
-            self.logger.warning(f"处理PDF图片失败: {e}")
+            self.logger.warning("处理PDF图片失败: %s", e)
     
-    def _calculate_pdf_image_size(self, image_data: bytes) -> Tuple[float, float]:
+    def _calculate_pdf_image_size(self, size: Optional[Tuple[int, int]]) -> Tuple[float, float]:
         """计算PDF中的图片显示尺寸"""
         try:
-            try:
-                from PIL import Image as PILImage
-                import io
-                with PILImage.open(io.BytesIO(image_data)) as pil_img:
-                    orig_width, orig_height = pil_img.size
-            except ImportError:
-                orig_width, orig_height = 600, 400
+            orig_width, orig_height = size or (600, 400)
             
             # 计算合适的显示尺寸
-            page_width = A4[0] - 3*cm
-            page_height = A4[1] - 4*cm
+            page_width = _PAGE_W_USABLE
+            page_height = _PAGE_H_USABLE
             
             # 智能缩放
             scale_w = page_width / orig_width
@@ -975,42 +1314,53 @@ class EnhancedOneNoteContentParser:
             return final_width, final_height
             
         except Exception:
-            return 4*inch, 3*inch  # 默认尺寸
+            return _DEFAULT_IMG_SIZE  # 默认尺寸
     
-    def _process_text_for_pdf(self, text_elem: ET.Element, story: List, normal_style: ParagraphStyle):
+    def _process_text_for_pdf(self, text: str, indent_level: int, story: List, normal_style: ParagraphStyle):
         """处理PDF文本"""
-        if text_elem.text:
-            text = self._clean_text_content(text_elem.text)
-            if text.strip():
-                # 获取缩进级别
-                indent_level = self._get_text_indent_level(text_elem)
-                
-                # 创建带缩进的样式
-                if indent_level > 0:
-                    text_style = ParagraphStyle(
-                        f'Indent{indent_level}',
-                        parent=normal_style,
-                        leftIndent=indent_level * 15,
-                        bulletIndent=indent_level * 10 if indent_level > 0 else 0
-                    )
-                else:
-                    text_style = normal_style
-                
-                story.append(Paragraph(text, text_style))
-                story.append(Spacer(1, 3))
+        # 带缩进的样式按级别缓存，同一级别只创建一次
+        if indent_level > 0:
+            text_style = self._indent_styles.get(indent_level)
+            if text_style is None:
+                text_style = self._indent_styles[indent_level] = ParagraphStyle(
+                    f'Indent{indent_level}',
+                    parent=normal_style,
+                    leftIndent=indent_level * 15,
+                    bulletIndent=indent_level * 10
+                )
+        else:
+            text_style = normal_style
+        
+        story.append(Paragraph(text, text_style))
+        story.append(Spacer(1, 3))
 
 
 # ======= GUI =======
+# 树项目 UserRole 数据为 (类型, ID, 名称) 元组
+_TYPE_NB, _TYPE_SEC, _TYPE_PAGE = 0, 1, 2
+
+
 class ModernOneNoteGUI(QMainWindow):
     def __init__(self):
         super().__init__()
         self.onenote = OneNoteAPI()
-        self.parser = EnhancedOneNoteContentParser()  # 使用增强解析器
         self.selected_items=[]; self.output_dir=''
         self._busy=False
         self._loading_thread = None
-        self._populate_thread = None
         self._convert_thread = None
+        # 已被替换但仍在收尾的线程：保留引用直到finished，界面线程不阻塞等待
+        self._retired_threads: set = set()
+        self._closing = False; self._force_close = False
+        self._render_pool: Optional[ProcessPoolExecutor] = None  # 常驻渲染进程池，首次并行转换时创建
+        self._items_by_id: Dict[str, QTreeWidgetItem] = {}  # 笔记本/分区/页面ID -> 树项
+        self._page_items: List[QTreeWidgetItem] = []  # 按树顺序排列的页面项
+        self._flat_pages: List[Tuple[str, str, str, str]] = []  # 与_page_items一一对应的页面记录
+        # 日志先缓冲，每100ms合并写入一次
+        self._log_buf: deque = deque()
+        self._log_timer = QTimer(self)
+        self._log_timer.setSingleShot(True)
+        self._log_timer.setInterval(100)
+        self._log_timer.timeout.connect(self._flush_log)
         self._setup_logging(); self._init_ui(); self._apply_styles()
         
         self.setAttribute(Qt.WA_OpaquePaintEvent, True)
@@ -1098,8 +1448,12 @@ class ModernOneNoteGUI(QMainWindow):
         self.cb_pdf.setChecked(True)
         self.cb_docx = QCheckBox('导出Word (增强图片/表格)')
         self.cb_docx.setChecked(True)
+        self.cb_parallel = QCheckBox('多进程并行转换')
+        self.cb_parallel.setChecked(True)
+        self.cb_parallel.setToolTip('取消勾选则在单线程中逐页转换，便于排查问题')
         fg.addWidget(self.cb_pdf)
         fg.addWidget(self.cb_docx)
+        fg.addWidget(self.cb_parallel)
         rv.addWidget(fmt_g)
         
         # 转换按钮
@@ -1318,7 +1672,7 @@ class ModernOneNoteGUI(QMainWindow):
         self._busy=busy
         
         controls = [self.refresh_btn,self.btn_all,self.btn_none,self.btn_dir,
-                   self.cb_pdf,self.cb_docx,self.convert_btn]
+                   self.cb_pdf,self.cb_docx,self.cb_parallel,self.convert_btn]
         
         for w in controls:
             w.setEnabled(not busy)
@@ -1332,7 +1686,20 @@ class ModernOneNoteGUI(QMainWindow):
 
     def _log(self, msg: str):
         ts = QDateTime.currentDateTime().toString('hh:mm:ss')
-        self.log.append(f'[{ts}] {msg}')
+        self._log_buf.append(f'[{ts}] {msg}')
+        if not self._log_timer.isActive():
+            self._log_timer.start()
+
+    def _flush_log(self):
+        """把缓冲的日志一次性写入，只重排和滚动一次"""
+        if not self._log_buf:
+            return
+        lines = '\n'.join(self._log_buf)
+        self._log_buf.clear()
+        if not self.log.document().isEmpty():
+            lines = '\n' + lines
+        self.log.moveCursor(QTextCursor.End)
+        self.log.insertPlainText(lines)
         self.log.verticalScrollBar().setValue(self.log.verticalScrollBar().maximum())
 
     def _refresh(self):
@@ -1341,13 +1708,14 @@ class ModernOneNoteGUI(QMainWindow):
         self.refresh_status.show_loading('🔍 正在检测OneNote...')
         self.tree.clear()
         self._log('开始加载笔记本...')
+        self.onenote.invalidate_cache()
         
-        if hasattr(self, '_item_cache'):
-            self._item_cache.clear()
+        self._items_by_id.clear()
+        self._page_items.clear()
+        self._flat_pages = []
         
         if self._loading_thread and self._loading_thread.isRunning():
-            self._loading_thread.terminate()
-            self._loading_thread.wait(100)
+            self._retire_thread(self._loading_thread)
         
         self._loading_thread = _DetectWorker(self.onenote)
         self._loading_thread.progress.connect(self._on_detect_progress, Qt.QueuedConnection)
@@ -1360,117 +1728,61 @@ class ModernOneNoteGUI(QMainWindow):
         self.refresh_status.show_loading(msg)
         self._log(msg)
 
-    def _on_loaded(self, notebooks: dict):
-        self.refresh_status.show_loading('📚 读取笔记本 0%')
+    def _on_loaded(self, notebooks: dict, flat: list, nb_count: int, sec_count: int):
+        """笔记本数据已就绪：直接在界面线程构建树，统计数字由检测线程一并给出"""
+        self.refresh_status.show_loading('📚 读取笔记本...')
         self._log('📚 开始读取笔记本页面...')
         
-        if self._populate_thread and self._populate_thread.isRunning():
-            self._populate_thread.terminate()
-            self._populate_thread.wait(100)
-        
-        self._populate_thread = _PopulateWorker(notebooks)
-        self._populate_thread.all_data.connect(self._build_tree_fast, Qt.QueuedConnection)
-        self._populate_thread.progress.connect(self._on_populate_progress, Qt.QueuedConnection)
-        self._populate_thread.msg.connect(self._log, Qt.QueuedConnection)
-        self._populate_thread.done.connect(self._on_pop_done, Qt.QueuedConnection)
-        self._populate_thread.err.connect(self._on_pop_err, Qt.QueuedConnection)
-        self._populate_thread.start(QThread.HighPriority)
-    
-    def _on_populate_progress(self, percent: int):
-        """处理构建进度"""
-        if percent < 100:
-            self.refresh_status.show_loading(f'📚 读取笔记本 {percent}%')
+        self._flat_pages = flat
+        self._build_tree_fast(notebooks)
+        self._on_pop_done(nb_count, sec_count, len(flat))
 
     def _on_load_err(self, msg: str):
         self.refresh_status.hide_loading(); self._set_busy(False)
         self._log(f'❌ 加载失败: {msg}')
 
     def _build_tree_fast(self, notebooks: dict):
-        """超高速构建整个树形结构"""
+        """超高速构建整个树形结构：先创建脱离树的项目，再按父节点整批挂接"""
         try:
             self.tree.setUpdatesEnabled(False)
             self.tree.blockSignals(True)
             self.tree.setVisible(False)
             
-            self._notebooks_data = notebooks
-            self._build_items = []
-            self._build_index = 0
+            self._items_by_id.clear()
+            self._page_items.clear()
             
+            nb_items = []
             for nb_id, nb_data in notebooks.items():
-                nb_name = nb_data['name']
-                self._build_items.append(('notebook', None, nb_id, nb_name))
-                
+                nb_it = self._make_tree_item('📚', '笔记本', _TYPE_NB, nb_id, nb_data['name'])
+                sec_items = []
                 for sec_id, sec_data in nb_data.get('sections', {}).items():
-                    sec_name = sec_data['name']
-                    self._build_items.append(('section', nb_id, sec_id, sec_name))
-                    
-                    for page_id, page_data in sec_data.get('pages', {}).items():
-                        page_name = page_data['name']
-                        self._build_items.append(('page', sec_id, page_id, page_name))
-            
-            self._item_cache = {}
-            self._build_timer = QTimer()
-            self._build_timer.timeout.connect(self._build_batch)
-            self._build_timer.start(1)
+                    sec_it = self._make_tree_item('📁', '分区', _TYPE_SEC, sec_id, sec_data['name'])
+                    pages = [self._make_tree_item('📄', '页面', _TYPE_PAGE, page_id, page_data['name'])
+                             for page_id, page_data in sec_data.get('pages', {}).items()]
+                    sec_it.addChildren(pages)
+                    self._page_items.extend(pages)
+                    sec_items.append(sec_it)
+                nb_it.addChildren(sec_items)
+                nb_items.append(nb_it)
+            
+            # 每个父节点只触发一次插入，展开需在挂入树之后进行
+            self.tree.addTopLevelItems(nb_items)
+            for nb_it in nb_items:
+                nb_it.setExpanded(True)
             
         except Exception as e:
             self._log(f'❌ 快速构建失败: {e}')
+        finally:
             self._finish_build()
     
-    def _build_batch(self):
-        """分批构建树项目"""
-        try:
-            batch_size = 100
-            end_index = min(self._build_index + batch_size, len(self._build_items))
-            
-            for i in range(self._build_index, end_index):
-                item_type, parent_id, item_id, item_name = self._build_items[i]
-                
-                if item_type == 'notebook':
-                    it = QTreeWidgetItem(self.tree)
-                    it.setText(0, f'📚 {item_name}')
-                    it.setText(1, '笔记本')
-                    it.setFlags(it.flags() | Qt.ItemIsUserCheckable)
-                    it.setCheckState(0, Qt.Unchecked)
-                    it.setData(0, Qt.UserRole, {'type': 'notebook', 'id': item_id, 'name': item_name})
-                    it.setExpanded(True)
-                    self._item_cache[item_id] = it
-                    
-                elif item_type == 'section':
-                    parent = self._item_cache.get(parent_id)
-                    if parent:
-                        it = QTreeWidgetItem(parent)
-                        it.setText(0, f'📁 {item_name}')
-                        it.setText(1, '分区')
-                        it.setFlags(it.flags() | Qt.ItemIsUserCheckable)
-                        it.setCheckState(0, Qt.Unchecked)
-                        it.setData(0, Qt.UserRole, {'type': 'section', 'id': item_id, 'name': item_name})
-                        self._item_cache[item_id] = it
-                
-                elif item_type == 'page':
-                    parent = self._item_cache.get(parent_id)
-                    if parent:
-                        it = QTreeWidgetItem(parent)
-                        it.setText(0, f'📄 {item_name}')
-                        it.setText(1, '页面')
-                        it.setFlags(it.flags() | Qt.ItemIsUserCheckable)
-                        it.setCheckState(0, Qt.Unchecked)
-                        it.setData(0, Qt.UserRole, {'type': 'page', 'id': item_id, 'name': item_name})
-            
-            self._build_index = end_index
-            
-            progress = int(self._build_index * 100 / len(self._build_items))
-            if progress % 10 == 0 and progress < 100:
-                self.refresh_status.show_loading(f'📚 读取笔记本 {progress}%')
-            
-            if self._build_index >= len(self._build_items):
-                self._build_timer.stop()
-                self._finish_build()
-                
-        except Exception as e:
-            self._log(f'❌ 批处理失败: {e}')
-            self._build_timer.stop()
-            self._finish_build()
+    def _make_tree_item(self, icon: str, kind: str, item_type: int, item_id: str, item_name: str) -> QTreeWidgetItem:
+        """创建未挂接的可勾选树项目"""
+        it = QTreeWidgetItem([f'{icon} {item_name}', kind])
+        it.setFlags(it.flags() | Qt.ItemIsUserCheckable)
+        it.setCheckState(0, Qt.Unchecked)
+        it.setData(0, Qt.UserRole, (item_type, item_id, item_name))
+        self._items_by_id[item_id] = it
+        return it
     
     def _finish_build(self):
         """完成构建"""
@@ -1479,42 +1791,17 @@ class ModernOneNoteGUI(QMainWindow):
             self.tree.blockSignals(False)
             self.tree.setUpdatesEnabled(True)
             self.refresh_status.hide_loading()
-            
-            if hasattr(self, '_build_items'):
-                del self._build_items
-            if hasattr(self, '_build_index'):
-                del self._build_index
-            if hasattr(self, '_notebooks_data'):
-                del self._notebooks_data
-                
         except Exception as e:
             self._log(f'❌ 读取时出错: {e}')
 
     def _find_item_by_id(self, id_: str):
-        it = QTreeWidgetItemIterator(self.tree)
-        while it.value():
-            item = it.value()
-            d=item.data(0,Qt.UserRole)
-            if d and d.get('id')==id_: return item
-            it+=1
-        return None
+        return self._items_by_id.get(id_)
 
     def _on_pop_done(self, nb:int, sec:int, pg:int):
         """完成界面构建"""
         self.refresh_status.hide_loading()
         self._log(f'✅ 读取完成：{nb} 笔记本，{sec} 分区，{pg} 页面')
-        
-        if hasattr(self, '_item_cache'):
-            self._item_cache.clear()
-        self._set_busy(False)
-
-    def _on_pop_err(self, msg:str):
-        """构建失败处理"""
-        self.refresh_status.hide_loading()
         self._set_busy(False)
-        self._log(f'❌ 构建失败: {msg}')
-        if hasattr(self, '_item_cache'):
-            self._item_cache.clear()
 
     def _on_item_changed(self, item, col):
         """处理树控件项目变化，实现级联勾选"""
@@ -1528,33 +1815,32 @@ class ModernOneNoteGUI(QMainWindow):
             if not data:
                 return
                 
-            item_type = data.get('type')
+            item_type = data[0]
             check_state = item.checkState(0)
             
-            if item_type == 'notebook':
-                self._cascade_check_notebook(item, check_state)
-            elif item_type == 'section':
-                self._cascade_check_section(item, check_state)
-            elif item_type == 'page':
+            if item_type == _TYPE_PAGE:
                 self._update_parent_check_state(item)
+            else:
+                self._cascade_check(item, check_state)
                 
         finally:
             self.tree.blockSignals(False)
             self._update_selection()
             self._update_convert()
     
-    def _cascade_check_notebook(self, notebook_item, check_state):
-        """级联勾选笔记本下的所有分区和页面"""
-        for i in range(notebook_item.childCount()):
-            section_item = notebook_item.child(i)
-            section_item.setCheckState(0, check_state)
-            self._cascade_check_section(section_item, check_state)
-    
-    def _cascade_check_section(self, section_item, check_state):
-        """级联勾选分区下的所有页面"""
-        for i in range(section_item.childCount()):
-            page_item = section_item.child(i)
-            page_item.setCheckState(0, check_state)
+    def _cascade_check(self, root_item, check_state):
+        """级联勾选笔记本/分区下的所有后代，显式栈一次遍历，期间暂停重绘"""
+        self.tree.setUpdatesEnabled(False)
+        try:
+            stack = [root_item]
+            while stack:
+                node = stack.pop()
+                for i in range(node.childCount()):
+                    child = node.child(i)
+                    child.setCheckState(0, check_state)
+                    stack.append(child)
+        finally:
+            self.tree.setUpdatesEnabled(True)
     
     def _update_parent_check_state(self, page_item):
         """根据子页面的勾选状态更新父分区的勾选状态"""
@@ -1605,14 +1891,9 @@ class ModernOneNoteGUI(QMainWindow):
             notebook_item.setCheckState(0, Qt.PartiallyChecked)
 
     def _update_selection(self):
-        sel=[]; it=QTreeWidgetItemIterator(self.tree)
-        while it.value():
-            item=it.value(); d=item.data(0,Qt.UserRole)
-            if d and d.get('type')=='page' and item.checkState(0)==Qt.Checked:
-                sec=item.parent(); nb=sec.parent() if sec else None
-                sel.append({'page_id': d['id'], 'page_name': d['name'], 'section_name': (sec.data(0,Qt.UserRole) or {}).get('name',''), 'notebook_name': (nb.data(0,Qt.UserRole) or {}).get('name','')})
-            it+=1
-        self.selected_items=sel
+        # 页面项与扁平记录顺序一致，按位置取记录，无需回溯父节点
+        self.selected_items=[rec for rec, item in zip(self._flat_pages, self._page_items)
+                             if item.checkState(0)==Qt.Checked]
 
     def _update_convert(self):
         ok = bool(self.selected_items) and bool(self.output_dir)
@@ -1625,21 +1906,25 @@ class ModernOneNoteGUI(QMainWindow):
             self.output_dir=d; self.lbl_out.setText(d); self._update_convert()
 
     def _select_all(self):
-        it=QTreeWidgetItemIterator(self.tree)
-        while it.value():
-            item=it.value()
-            if item.flags() & Qt.ItemIsUserCheckable:
-                item.setCheckState(0,Qt.Checked)
-            it+=1
-        self._update_selection(); self._update_convert()
+        self._set_all_checked(Qt.Checked)
 
     def _select_none(self):
-        it=QTreeWidgetItemIterator(self.tree)
-        while it.value():
-            item=it.value()
-            if item.flags() & Qt.ItemIsUserCheckable:
-                item.setCheckState(0,Qt.Unchecked)
-            it+=1
+        self._set_all_checked(Qt.Unchecked)
+
+    def _set_all_checked(self, state):
+        """全选/全不选：屏蔽逐项级联信号并暂停重绘，最后只刷新一次选择"""
+        self.tree.setUpdatesEnabled(False)
+        self.tree.blockSignals(True)
+        try:
+            it=QTreeWidgetItemIterator(self.tree)
+            while it.value():
+                item=it.value()
+                if item.flags() & Qt.ItemIsUserCheckable:
+                    item.setCheckState(0,state)
+                it+=1
+        finally:
+            self.tree.blockSignals(False)
+            self.tree.setUpdatesEnabled(True)
         self._update_selection(); self._update_convert()
 
     def _convert(self):
@@ -1647,6 +1932,13 @@ class ModernOneNoteGUI(QMainWindow):
             QMessageBox.warning(self,'提示','请选择页面和输出目录')
             return
         
+        # 输出路径在界面线程一次算好，转换线程只负责取页面与渲染
+        try:
+            pages = _plan_jobs(self.selected_items, self.output_dir)
+        except OSError as e:
+            QMessageBox.critical(self,'错误', f'无法创建输出目录: {e}')
+            return
+        
         self._set_busy(True)
         self.conv_status.show_loading('🚀 正在转换...')
         self.progress.setVisible(True)
@@ -1654,14 +1946,17 @@ class ModernOneNoteGUI(QMainWindow):
         self.log.clear()
         
         if self._convert_thread and self._convert_thread.isRunning():
-            self._convert_thread.terminate()
-            self._convert_thread.wait(100)
+            self._convert_thread.abort()
+            self._retire_thread(self._convert_thread)
         
+        parallel = self.cb_parallel.isChecked()
         self._convert_thread = _EnhancedConvertWorker(  # 使用增强转换工作器
-            self.onenote, self.parser, self.selected_items, self.output_dir,
+            self.onenote, pages,
             self.cb_pdf.isChecked(), self.cb_docx.isChecked(),
             True,  # 图片默认导出
-            False  # 不支持附件
+            False,  # 不支持附件
+            parallel,
+            self._get_render_pool() if parallel else None
         )
         
         self._convert_thread.progress.connect(self.progress.setValue, Qt.QueuedConnection)
@@ -1670,6 +1965,31 @@ class ModernOneNoteGUI(QMainWindow):
         self._convert_thread.err.connect(self._conv_err, Qt.QueuedConnection)
         self._convert_thread.start(QThread.NormalPriority)
 
+    def _retire_thread(self, thread: QThread):
+        """替换仍在运行的线程：断开其结果信号，保留引用直到finished，不在界面线程中wait()"""
+        for name in ('progress', 'msg', 'done', 'err'):
+            sig = getattr(thread, name, None)
+            if sig is not None:
+                try:
+                    sig.disconnect()
+                except TypeError:
+                    pass
+        self._retired_threads.add(thread)
+        thread.finished.connect(lambda t=thread: self._retired_threads.discard(t), Qt.QueuedConnection)
+
+    def _get_render_pool(self) -> Optional[ProcessPoolExecutor]:
+        """获取常驻渲染进程池；子进程及其中的解析器、字体在多次转换间复用"""
+        if self._render_pool is not None and self._convert_thread is not None \
+                and self._convert_thread.pool_broken:
+            self._render_pool.shutdown(wait=False)
+            self._render_pool = None
+        if self._render_pool is None:
+            try:
+                self._render_pool = ProcessPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) - 1))
+            except (OSError, NotImplementedError) as e:
+                self._log(f'⚠️ 无法创建进程池: {e}')
+        return self._render_pool
+
     def _conv_done(self):
         self.progress.setValue(100); self.conv_status.hide_loading(); self._set_busy(False)
         QMessageBox.information(self,'完成','转换完成')
@@ -1678,21 +1998,34 @@ class ModernOneNoteGUI(QMainWindow):
         self.progress.setVisible(False); self.conv_status.hide_loading(); self._set_busy(False)
         QMessageBox.critical(self,'错误', m)
     
+    def _close_now(self):
+        """等待后台线程超时后强制关闭（线程已先结束、窗口已关闭时不再处理）"""
+        if self.isVisible():
+            self._force_close = True
+            self.close()
+
     def closeEvent(self, event):
         """关闭事件处理"""
+        running = [t for t in (self._loading_thread, self._convert_thread, *self._retired_threads)
+                   if t is not None and t.isRunning()]
+        if running and not self._force_close:
+            # 不在界面线程中wait()：协作式取消后忽略本次关闭，线程结束（finished）时再次关闭；
+            # 卡在COM/PowerShell调用中的线程最多等5秒
+            for thread in running:
+                if isinstance(thread, _EnhancedConvertWorker):
+                    thread.abort()
+            if not self._closing:
+                self._closing = True
+                self._log('⏳ 正在等待后台任务结束...')
+                for thread in running:
+                    thread.finished.connect(self.close, Qt.QueuedConnection)
+                QTimer.singleShot(5000, self._close_now)
+            event.ignore()
+            return
         try:
-            for thread in [getattr(self, '_loading_thread', None), 
-                          getattr(self, '_populate_thread', None), 
-                          getattr(self, '_convert_thread', None)]:
-                if thread and thread.isRunning():
-                    thread.terminate()
-                    thread.wait(100)
-            
-            if hasattr(self, '_build_timer') and self._build_timer.isActive():
-                self._build_timer.stop()
-            
-            if hasattr(self, 'parser'):
-                self.parser.cleanup_temp_files()
+            if self._render_pool is not None:
+                self._render_pool.shutdown(wait=False)
+            self.onenote.close()
                 
         except Exception:
             pass
@@ -1708,150 +2041,289 @@ class ModernOneNoteGUI(QMainWindow):
 # ======= 线程 =======
 class _DetectWorker(QThread):
     progress = pyqtSignal(str)
-    done = pyqtSignal(dict)
+    done = pyqtSignal(dict, list, int, int)  # 笔记本数据, 扁平页面记录, 笔记本数, 分区数
     err = pyqtSignal(str)
     
     def __init__(self, api: OneNoteAPI):
         super().__init__()
         self.api=api
-        self.setTerminationEnabled(True)
         
     def run(self):
         try:
             self.progress.emit('🔍 正在连接OneNote...')
-            self.msleep(10)
             
             if not self.api.initialize():
                 self.err.emit('无法连接OneNote')
                 return
             
             self.progress.emit('📚 正在获取笔记本列表...')
-            self.msleep(10)
             
             nbs = self.api.get_notebooks()
             if not nbs:
                 self.err.emit('未发现笔记本')
                 return
             
-            total = sum(len(s.get('pages',{})) for nb in nbs.values() for s in nb.get('sections',{}).values())
-            self.progress.emit(f'✅ 发现 {len(nbs)} 个笔记本，{total} 个页面')
-            self.msleep(10)
-            
-            self.done.emit(nbs)
-        except Exception as e:
-            self.err.emit(str(e))
-
-
-class _PopulateWorker(QThread):
-    all_data = pyqtSignal(dict)
-    progress = pyqtSignal(int)
-    msg = pyqtSignal(str)
-    done = pyqtSignal(int,int,int)
-    err = pyqtSignal(str)
-    
-    def __init__(self, notebooks: dict):
-        super().__init__()
-        self.nbs = notebooks
-        self.setTerminationEnabled(True)
-        
-    def run(self):
-        """一次性处理所有数据，不分批"""
-        try:
-            nb_count = len(self.nbs)
+            # 一次遍历展开为扁平页面记录（笔记本名, 分区名, 页面ID, 页面名），顺序与树一致
+            flat = []
             sec_count = 0
-            pg_count = 0
-            
-            for nb_data in self.nbs.values():
-                for sec_data in nb_data.get('sections', {}).values():
+            for nb in nbs.values():
+                for s in nb.get('sections', {}).values():
                     sec_count += 1
-                    pg_count += len(sec_data.get('pages', {}))
-            
-            self.progress.emit(50)
-            self.msleep(10)
-            
-            self.all_data.emit(self.nbs)
-            
-            self.progress.emit(100)
-            self.done.emit(nb_count, sec_count, pg_count)
+                    flat.extend((nb['name'], s['name'], pid, pg['name'])
+                                for pid, pg in s.get('pages', {}).items())
+            self.progress.emit(f'✅ 发现 {len(nbs)} 个笔记本，{len(flat)} 个页面')
             
+            self.done.emit(nbs, flat, len(nbs), sec_count)
         except Exception as e:
             self.err.emit(str(e))
 
 
+# ======= 并行渲染（进程池） =======
+_job_local = threading.local()  # 每个工作进程/线程各自持有一个解析器
+_GC_EVERY = 32  # 每个工作进程/线程渲染多少页后做一次完整垃圾回收
+_RE_UNSAFE = re.compile(r'[^\w \-.]')  # 文件名只保留字母数字、下划线、空格、-和.
+
+
+def _safe(s: str) -> str:
+    """把笔记本/分区/页面名称转换为安全的文件名"""
+    return _RE_UNSAFE.sub('', s or '未命名').strip()[:100] or '未命名'
+
+
+def _plan_jobs(items: List[Tuple[str, str, str, str]], out_dir: str) -> List[Tuple[str, str, str]]:
+    """把选中的页面记录转换为(页面ID, 页面名称, 输出路径前缀)列表，并创建所需的分区目录"""
+    out = Path(out_dir)
+    dirs: Dict[Tuple[str, str], Path] = {}  # 同一分区的页面共用目录，只创建一次
+    plan = []
+    for nb_name, sec_name, page_id, page_name in items:
+        key = (nb_name, sec_name)
+        d = dirs.get(key)
+        if d is None:
+            d = dirs[key] = out / _safe(nb_name) / _safe(sec_name)
+            d.mkdir(parents=True, exist_ok=True)
+        plan.append((page_id, page_name, str(d / _safe(page_name))))
+    return plan
+
+
+def _job_parser() -> 'EnhancedOneNoteContentParser':
+    """当前进程/线程专用的解析器"""
+    parser = getattr(_job_local, 'parser', None)
+    if parser is None:
+        parser = _job_local.parser = EnhancedOneNoteContentParser()
+    return parser
+
+
+def _render_page_job(xml: str, name: str, out_stem: str, docx: bool, pdf: bool,
+                     tmpdir: Path) -> List[Tuple[str, bool]]:
+    """在工作进程（或线程）中渲染单个页面，返回[(格式, 是否成功)]"""
+    parser = _job_parser()
+    if parser._tmpdir != tmpdir:
+        parser.set_tmpdir(tmpdir)
+    results = []
+    blocks = None
+    try:
+        # 页面只解析一次，Word与PDF共用同一份内容块
+        blocks = parser.parse_page(xml)
+        # Word导出
+        if docx:
+            results.append(('Word', parser.render_docx(blocks, name, out_stem + '.docx')))
+        # PDF导出
+        if pdf:
+            results.append(('PDF', parser.render_pdf(blocks, name, out_stem + '.pdf')))
+    finally:
+        # 每页只删除本页登记的图片文件；临时目录随整次导出的TemporaryDirectory一起清理
+        blocks = None
+        parser.release_page_files()
+        # 文档对象之间存在循环引用，定期完整回收，避免常驻内存随页数增长
+        _job_local.pages = pages = getattr(_job_local, 'pages', 0) + 1
+        if pages % _GC_EVERY == 0:
+            gc.collect()
+    return results
+
+
 class _EnhancedConvertWorker(QThread):
     progress = pyqtSignal(int)
     msg = pyqtSignal(str)
     done = pyqtSignal()
     err = pyqtSignal(str)
     
-    def __init__(self, api: OneNoteAPI, parser: EnhancedOneNoteContentParser, 
-                 items: List[dict], out_dir: str, pdf: bool, docx: bool, 
-                 images: bool, attachments: bool):
+    # 预取队列上限：页面XML可能很大，只提前取少量页面
+    FETCH_AHEAD = 4
+    # 熔断：连续失败超过FAIL_FAST_AFTER页后不再重试，达到GIVE_UP_AFTER页则放弃剩余页面
+    FAIL_FAST_AFTER = 5
+    GIVE_UP_AFTER = 20
+    
+    def __init__(self, api: OneNoteAPI, 
+                 pages: List[Tuple[str, str, str]], pdf: bool, docx: bool, 
+                 images: bool, attachments: bool, parallel: bool = True,
+                 pool: Optional[ProcessPoolExecutor] = None):
         super().__init__()
         self.api = api
-        self.parser = parser
-        self.items = items
-        self.out = Path(out_dir)
+        self.pages = pages  # [(页面ID, 页面名称, 输出路径前缀)]
         self.pdf = pdf
         self.docx = docx
         self.images = images
         self.attach = attachments
+        self.parallel = parallel
+        self.pool = pool  # 界面持有的常驻进程池，跨多次转换复用
+        self.pool_broken = False
+        self.workers = max(1, min(os.cpu_count() or 1, len(pages)))
+        self._abort = threading.Event()
+        self._msg_buf: List[str] = []
+        self._msg_last = 0.0
+        self._gave_up = False
+    
+    def abort(self):
+        """请求取消转换；在页面边界生效"""
+        self._abort.set()
+    
+    def _emit_msg(self, text: str):
+        """缓冲日志消息，满32条或距上次发送超过100ms时合并为一次信号；
+        转换线程没有事件循环，另在每次可能阻塞等待之前调用 _flush_pending() 发出缓冲"""
+        self._msg_buf.append(text)
+        now = time.monotonic()
+        if len(self._msg_buf) >= 32 or now - self._msg_last > 0.1:
+            self._flush_msgs(now)
+    
+    def _flush_msgs(self, now: Optional[float] = None):
+        """把缓冲的日志消息作为一个多行文本块发出"""
+        if self._msg_buf:
+            self.msg.emit('\n'.join(self._msg_buf))
+            self._msg_buf.clear()
+        self._msg_last = time.monotonic() if now is None else now
+    
+    def _flush_pending(self):
+        """即将阻塞等待（取下一页、等渲染结果、串行渲染）时先发出缓冲的消息，
+        避免消息停留到下一页才显示"""
+        if self._msg_buf:
+            self._flush_msgs()
+    
+    def _fetch_pages(self, jobs: 'queue.Queue'):
+        """预取线程：按顺序获取页面XML（I/O密集），交给渲染进程"""
+        if COM_AVAILABLE:
+            pythoncom.CoInitialize()
+        try:
+            fails = 0
+            for page_id, name, out_stem in self.pages:
+                if self._abort.is_set():
+                    break
+                try:
+                    # 获取页面内容；OneNote连续出错时改为只尝试一次
+                    retries = 1 if fails > self.FAIL_FAST_AFTER else 3
+                    xml = self.api.get_page_content(page_id, max_retries=retries)
+                    fails = 0 if xml else fails + 1
+                    jobs.put((name, out_stem, xml, None))
+                except Exception as e:
+                    fails += 1
+                    jobs.put((name, out_stem, '', e))
+                if fails >= self.GIVE_UP_AFTER:
+                    self._gave_up = True
+                    break
+        finally:
+            jobs.put(None)
+            if COM_AVAILABLE:
+                pythoncom.CoUninitialize()
         
     def run(self):
         try:
-            n = len(self.items)
+            n = len(self.pages)
             done = 0
+            last_pct, last_emit = -1, 0.0
             
-            for it in self.items:
+            def report(name, fut=None, error=None):
+                nonlocal done, last_pct, last_emit
                 try:
-                    pid = it['page_id']
-                    name = it['page_name']
-                    nb = it['notebook_name']
-                    sec = it['section_name']
-                    
-                    safe = lambda s: ''.join(c for c in (s or '未命名') if c.isalnum() or c in (' ','-','_','.')).strip()[:100] or '未命名'
-                    d = self.out / safe(nb) / safe(sec)
-                    d.mkdir(parents=True, exist_ok=True)
-                    
-                    # 获取页面内容，增加重试机制
-                    xml = self.api.get_page_content(pid, max_retries=3)
-                    if not xml: 
-                        self.msg.emit(f'⚠️ 空页面: {name}')
-                        continue
-
-                    # Word导出
-                    if self.docx:
-                        out = d / f'{safe(name)}.docx'
-                        ok = self.parser.parse_page_to_docx(xml, name, str(out), 
-                                                            include_images=True,
-                                                            include_attachments=False,
-                                                            embed_attachments=False,
-                                                            attachments_output_dir=None)
-                        self.msg.emit(f'{"✅" if ok else "❌"} Word (增强): {name}')
-
-                    # PDF导出
-                    if self.pdf:
-                        out = d / f'{safe(name)}.pdf'
-                        ok = self.parser.parse_page_to_pdf(xml, name, str(out), 
-                                                           include_images=True,
-                                                           include_attachments=False,
-                                                           attachments_output_dir=None)
-                        self.msg.emit(f'{"✅" if ok else "❌"} PDF (增强): {name}')
-
-                    done += 1
-                    self.progress.emit(int(done / max(n, 1) * 100))
-                    
+                    if error is not None:
+                        raise error
+                    if not fut.done():
+                        self._flush_pending()
+                    for kind, ok in fut.result():
+                        self._emit_msg(f'{"✅" if ok else "❌"} {kind} (增强): {name}')
                 except Exception as e:
-                    self.msg.emit(f"❌ 导出页面失败: {it['page_name']}，错误: {str(e)}")
-                    import traceback
-                    self.msg.emit(traceback.format_exc())
-                    done += 1
-                    self.progress.emit(int(done / max(n, 1) * 100))
+                    self._emit_msg(f"❌ 导出页面失败: {name}，错误: {str(e)}")
+                    self._emit_msg(''.join(traceback.format_exception(type(e), e, e.__traceback__)))
+                done += 1
+                # 进度节流：百分比变化且距上次发送超过100ms（或已完成）才发信号
+                pct = int(done / max(n, 1) * 100)
+                now = time.monotonic()
+                if pct != last_pct and (pct == 100 or now - last_emit >= 0.1):
+                    last_pct, last_emit = pct, now
+                    self.progress.emit(pct)
+            
+            # 预取与渲染流水线：线程取XML，进程池并行生成文档，结果按提交顺序汇报
+            jobs: 'queue.Queue' = queue.Queue(maxsize=self.FETCH_AHEAD)
+            threading.Thread(target=self._fetch_pages, args=(jobs,), daemon=True).start()
+            pending = deque()
+            pool = own_pool = None
+            if self.parallel:
+                pool = self.pool
+                if pool is None:
+                    self._emit_msg('⚠️ 进程池不可用，改用线程池转换')
+                    pool = own_pool = ThreadPoolExecutor(max_workers=min(8, (os.cpu_count() or 1) * 2))
+            # 本次导出的临时文件统一放在一个TemporaryDirectory中，异常时同样会被清理
+            with tempfile.TemporaryDirectory(prefix='onenote_exp_', dir=app_temp_root()) as tmp:
+                tmpdir = Path(tmp)
+                try:
+                    while True:
+                        if jobs.empty():
+                            self._flush_pending()
+                        job = jobs.get()
+                        if job is None:
+                            break
+                        if self._abort.is_set():
+                            # 取消：丢弃尚未渲染的页面，等预取线程收尾
+                            while jobs.get() is not None:
+                                pass
+                            for _, fut in pending:
+                                if not fut.cancel():
+                                    fut.exception()  # 已在运行的页面需等其结束，之后才能删除临时目录
+                            pending.clear()
+                            break
+                        name, out_stem, xml, error = job
+                        if error is not None:
+                            report(name, error=error)
+                            continue
+                        if not xml:
+                            self._emit_msg(f'⚠️ 空页面: {name}')
+                            continue
+                        args = (xml, name, out_stem, self.docx, self.pdf, tmpdir)
+                        if pool is None:
+                            # 串行模式：在当前线程直接渲染
+                            self._flush_pending()
+                            fut = Future()
+                            try:
+                                fut.set_result(_render_page_job(*args))
+                            except Exception as e:
+                                fut.set_exception(e)
+                        else:
+                            try:
+                                fut = pool.submit(_render_page_job, *args)
+                            except BrokenProcessPool:
+                                # 子进程无法启动（如打包环境受限），剩余页面改用线程池
+                                self._emit_msg('⚠️ 进程池不可用，改用线程池转换')
+                                self.pool_broken = True
+                                pool = own_pool = ThreadPoolExecutor(max_workers=min(8, (os.cpu_count() or 1) * 2))
+                                fut = pool.submit(_render_page_job, *args)
+                        pending.append((name, fut))
+                        job = xml = args = None  # 已交给渲染端，尽早释放页面XML
+                        while pending and (pending[0][1].done() or len(pending) > self.workers * 2):
+                            report(*pending.popleft())
+                    while pending:
+                        report(*pending.popleft())
                 finally:
-                    self.parser.cleanup_temp_files()
-            
-            self.done.emit()
+                    # 共享进程池由界面负责关闭，这里只关闭本次创建的线程池
+                    if own_pool is not None:
+                        own_pool.shutdown()
+            
+            if self._gave_up:
+                self._emit_msg(f'❌ 连续{self.GIVE_UP_AFTER}个页面获取失败，OneNote似乎不可用，已停止导出剩余页面')
+            if self._abort.is_set():
+                self._emit_msg('⏹ 转换已取消')
+                self._flush_msgs()
+            else:
+                self._flush_msgs()
+                self.done.emit()
         except Exception as e:
+            self._flush_msgs()
             self.err.emit(str(e))
 
 
@@ -1876,4 +2348,5 @@ def main():
 
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
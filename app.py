@@ -5,31 +5,76 @@ import sys
 import os
 import logging
 import base64
+import binascii
 import traceback
 import ctypes
 import tempfile
 import subprocess
 import re
+import struct
 import html
+import hashlib
+import io
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 from pathlib import Path
-from typing import Dict, List, Optional
-import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple
+
+# lxml 为 C 实现，解析/遍历远快于标准库；缺失时回退到 ElementTree
+try:
+    from lxml import etree as ET  # type: ignore
+    LXML_AVAILABLE = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    LXML_AVAILABLE = False
+# 只有lxml元素支持getparent()；启动时探测一次，不在循环里逐个hasattr
+HAS_GETPARENT = hasattr(ET.Element('probe'), 'getparent')
+
+# 预编译的正则，避免每次调用都查模式缓存
+_RE_TAGS = re.compile(r'<[^>]+>')
+_RE_WS = re.compile(r'\s+')
+_RE_HSPACE = re.compile(r'[\t\x0b\x0c]+')
+
+
+# PDF兼容性：替换弯引号与en-dash（项目符号和em-dash本身即可显示，无需映射）
+_PDF_PUNCT = str.maketrans({
+    '\u2013': '-',
+    '\u201c': '"', '\u201d': '"',
+    '\u2018': "'", '\u2019': "'",
+})
+
+
+def strip_tags(text: str) -> str:
+    """去除HTML标签；不含'<'的文本直接返回"""
+    return _RE_TAGS.sub('', text) if '<' in text else text
 
 # ======= 依赖（尽量最少） =======
 try:
+    import pythoncom  # type: ignore
     import win32com.client  # type: ignore
     import comtypes.client  # type: ignore
     COM_AVAILABLE = True
 except Exception:
     COM_AVAILABLE = False
 
+# PIL 仅在文件头无法识别图片尺寸时使用，可选
+try:
+    from PIL import Image as PILImage  # type: ignore
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget,
     QPushButton, QLabel, QTreeWidget, QTreeWidgetItem, QProgressBar,
-    QTextEdit, QGroupBox, QCheckBox, QFileDialog, QMessageBox, QSplitter,
-    QTreeWidgetItemIterator
+    QTextEdit, QGroupBox, QCheckBox, QFileDialog, QMessageBox, QSplitter
 )
-from PyQt5.QtCore import Qt, QTimer, QDateTime, QThread, pyqtSignal, QCoreApplication
+from PyQt5.QtCore import Qt, QTimer, QDateTime, QThread, pyqtSignal, QCoreApplication, QObject, QRunnable, QThreadPool, QSignalBlocker
 
 # Word/PDF 依赖
 from docx import Document
@@ -51,6 +96,32 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
 
+# PDF表格的固定样式命令（字体由调用方按当前中文字体追加）
+_PDF_TABLE_STYLE = [
+    # 外边框
+    ('BOX', (0, 0), (-1, -1), 1, colors.black),
+    # 内部网格线
+    ('INNERGRID', (0, 0), (-1, -1), 0.3, colors.grey),
+    # 垂直对齐
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    
+    # 标题行样式
+    ('BACKGROUND', (0, 0), (-1, 0), colors.darkgrey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('FONTSIZE', (0, 0), (-1, 0), 9),
+    
+    # 数据行样式
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+    
+    # 合理的内边距
+    ('LEFTPADDING', (0, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 0), (-1, -1), 3),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+]
+
 
 # ======= 工具函数 =======
 def is_admin() -> bool:
@@ -60,7 +131,50 @@ def is_admin() -> bool:
         return False
 
 
+class _PROCESSENTRY32W(ctypes.Structure):
+    _fields_ = [
+        ('dwSize', ctypes.c_uint32),
+        ('cntUsage', ctypes.c_uint32),
+        ('th32ProcessID', ctypes.c_uint32),
+        ('th32DefaultHeapID', ctypes.c_size_t),
+        ('th32ModuleID', ctypes.c_uint32),
+        ('cntThreads', ctypes.c_uint32),
+        ('th32ParentProcessID', ctypes.c_uint32),
+        ('pcPriClassBase', ctypes.c_long),
+        ('dwFlags', ctypes.c_uint32),
+        ('szExeFile', ctypes.c_wchar * 260),
+    ]
+
+
+def _process_running(exe_name: str) -> bool:
+    """用Toolhelp32快照在进程内枚举进程，不再启动tasklist"""
+    kernel32 = ctypes.windll.kernel32
+    kernel32.CreateToolhelp32Snapshot.restype = ctypes.c_void_p
+    kernel32.Process32FirstW.argtypes = [ctypes.c_void_p, ctypes.POINTER(_PROCESSENTRY32W)]
+    kernel32.Process32NextW.argtypes = [ctypes.c_void_p, ctypes.POINTER(_PROCESSENTRY32W)]
+    kernel32.CloseHandle.argtypes = [ctypes.c_void_p]
+    snap = kernel32.CreateToolhelp32Snapshot(0x2, 0)  # TH32CS_SNAPPROCESS
+    if not snap or snap == ctypes.c_void_p(-1).value:
+        raise OSError('CreateToolhelp32Snapshot失败')
+    try:
+        entry = _PROCESSENTRY32W()
+        entry.dwSize = ctypes.sizeof(_PROCESSENTRY32W)
+        target = exe_name.upper()
+        ok = kernel32.Process32FirstW(snap, ctypes.byref(entry))
+        while ok:
+            if entry.szExeFile.upper() == target:
+                return True
+            ok = kernel32.Process32NextW(snap, ctypes.byref(entry))
+        return False
+    finally:
+        kernel32.CloseHandle(snap)
+
+
 def check_onenote_process() -> bool:
+    try:
+        return _process_running('ONENOTE.EXE')
+    except Exception:
+        pass
     try:
         r = subprocess.run(['tasklist', '/FI', 'IMAGENAME eq ONENOTE.EXE'], capture_output=True, text=True)
         return 'ONENOTE.EXE' in r.stdout
@@ -68,9 +182,160 @@ def check_onenote_process() -> bool:
         return False
 
 
+def parse_xml(xml: str):
+    """解析OneNote XML字符串（lxml不接受带编码声明的str，统一转为UTF-8字节）"""
+    if LXML_AVAILABLE:
+        # huge_tree: 允许超过10MB的文本节点（大图片的base64数据）
+        return ET.fromstring(xml.encode('utf-8'), ET.XMLParser(huge_tree=True))
+    return ET.fromstring(xml)
+
+
+_IMAGE_DATA_ATTRS = ('data', 'Data', 'binaryData')
+_FILE_DATA_ATTRS = ('binaryData',)
+_MIN_PAYLOAD_CHARS = 16
+
+
+def take_payload(elem, attrs) -> Optional[bytes]:
+    """解码图片/附件元素携带的base64数据，并把这段文本从元素上移除以释放内存"""
+    # 依次尝试各属性与Data子元素；过短的值不可能是有效文件，直接跳过不解码
+    candidates = [elem.get(a) for a in attrs]
+    candidates.extend(c.text for c in elem if isinstance(c.tag, str) and 'Data' in c.tag)
+    data = None
+    for v in candidates:
+        if not v or len(v) <= _MIN_PAYLOAD_CHARS:
+            continue
+        try:
+            decoded = base64.b64decode(v, validate=False)
+        except (binascii.Error, ValueError):
+            continue
+        if len(decoded) >= 8:  # 至少容得下文件头，否则视为截断数据
+            data = decoded
+            break
+    drop_payload(elem, attrs)
+    return data
+
+
+def drop_payload(elem, attrs):
+    """移除图片/附件元素上的base64文本（属性与Data子元素）"""
+    for attr in attrs:
+        if attr in elem.attrib:
+            del elem.attrib[attr]
+    for c in elem:
+        if isinstance(c.tag, str) and 'Data' in c.tag:
+            c.text = None
+
+
+def _header_image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """直接读取PNG/GIF/BMP/JPEG/WebP文件头获取(宽, 高)，无法识别时返回None"""
+    try:
+        if data[:8] == b'\x89PNG\r\n\x1a\n':
+            w, h = struct.unpack('>II', data[16:24])
+        elif data[:6] in (b'GIF87a', b'GIF89a'):
+            w, h = struct.unpack('<HH', data[6:10])
+        elif data[:2] == b'BM':
+            w, h = struct.unpack('<ii', data[18:26])
+        elif data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+            chunk = data[12:16]
+            if chunk == b'VP8 ':
+                w, h = struct.unpack('<HH', data[26:30])
+                w, h = w & 0x3FFF, h & 0x3FFF
+            elif chunk == b'VP8L':
+                bits = int.from_bytes(data[21:25], 'little')
+                w, h = (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            elif chunk == b'VP8X':
+                w = int.from_bytes(data[24:27], 'little') + 1
+                h = int.from_bytes(data[27:30], 'little') + 1
+            else:
+                return None
+        elif data[:2] == b'\xff\xd8':
+            # 扫描JPEG段，找到SOFn帧头
+            i, n = 2, len(data)
+            while i + 9 < n:
+                if data[i] != 0xFF:
+                    i += 1
+                    continue
+                marker = data[i+1]
+                if marker == 0xFF:
+                    i += 1
+                elif 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    h, w = struct.unpack('>HH', data[i+5:i+9])
+                    break
+                elif marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                    i += 2
+                else:
+                    i += 2 + struct.unpack('>H', data[i+2:i+4])[0]
+            else:
+                return None
+        else:
+            return None
+    except struct.error:
+        return None
+    w, h = abs(w), abs(h)
+    return (w, h) if w and h else None
+
+
+def image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """获取图片尺寸：优先解析文件头，必要时回退到PIL；都失败时返回None"""
+    size = _header_image_size(data)
+    if size or not PIL_AVAILABLE:
+        return size
+    try:
+        with PILImage.open(io.BytesIO(data)) as pil_img:
+            return pil_img.size
+    except Exception:
+        return None
+
+
+def stream_page(xml: str, images: bool = True, attachments: bool = True):
+    """流式解析页面：单次遍历按本地名称归类全部元素（不含根元素），索引保持文档顺序；
+    图片/附件元素一闭合就解码其数据并丢弃base64文本，返回(索引, {元素: 数据})"""
+    index = defaultdict(list)
+    payloads = {}
+    src = io.BytesIO(xml.lstrip('\ufeff').encode('utf-8'))
+    if LXML_AVAILABLE:
+        # huge_tree: 允许超过10MB的文本节点（大图片的base64数据）
+        events = ET.iterparse(src, events=('start', 'end'), huge_tree=True)
+    else:
+        events = ET.iterparse(src, events=('start', 'end'))
+    root_name = None
+    for event, el in events:
+        tag = el.tag
+        if not isinstance(tag, str):
+            continue
+        name = tag.rpartition('}')[2]
+        if event == 'start':
+            # 在开始标签处登记，嵌套的大纲/表格保持父在前、子在后
+            if root_name is None:
+                root_name = name
+            index[name].append(el)
+            continue
+        # 元素闭合后数据才完整：未导出图片/附件时不解码，直接丢弃数据，避免大段base64留在树中
+        if name == 'Image':
+            if images:
+                payloads[el] = take_payload(el, _IMAGE_DATA_ATTRS)
+            else:
+                drop_payload(el, _IMAGE_DATA_ATTRS)
+        elif name == 'InsertedFile':
+            if attachments:
+                payloads[el] = take_payload(el, _FILE_DATA_ATTRS)
+            else:
+                drop_payload(el, _FILE_DATA_ATTRS)
+    if root_name is not None:
+        index[root_name].pop(0)  # 最先开始的是根元素
+    return index, payloads
+
+
+def iter_local(parent, name: str):
+    """命名空间无关地迭代parent下名为name的后代元素（不含parent自身）"""
+    if LXML_AVAILABLE:
+        # lxml的iter('{*}name')在C层完成过滤，但会包含parent自身
+        return (el for el in parent.iter(f'{{*}}{name}') if el is not parent)
+    return parent.iterfind(f'.//{{*}}{name}')
+
+
 # ======= 一些轻量 UI 组件 =======
 from PyQt5.QtCore import QTimer
-from PyQt5.QtGui import QPainter, QPen, QColor
+from PyQt5.QtGui import QPainter, QPen, QColor, QPalette
 
 
 class LoadingIndicator(QWidget):
@@ -134,10 +399,21 @@ class StatusIndicator(QWidget):
 
 # ======= OneNote API（COM优先，PowerShell回退） =======
 class OneNoteAPI:
+    # 笔记本层级在一次会话内很少变化，短时间内重复读取直接用缓存
+    HIERARCHY_TTL = 30.0
+
     def __init__(self):
-        self.app = None
-        self.temp_dir = tempfile.mkdtemp(prefix='onenote_app_')
+        self.app = None  # 最近一次initialize创建的代理；实际调用一律经_com_app()取本线程的对象
+        # COM代理只能在创建它的线程（单元）中使用：代理按线程保存在_tls中，记录成功的创建方式，
+        # 其他线程通过 com_thread() 按同样方式各自创建；所有COM调用串行执行
+        self._app_factory = None
+        self._app_lock = threading.Lock()
+        self._tls = threading.local()
         self.logger = logging.getLogger('OneNoteAPI')
+        self._ps_proc: Optional[subprocess.Popen] = None
+        self._ps_lock = threading.Lock()
+        self._nb_cache: Optional[Dict] = None
+        self._nb_cache_ts = 0.0
 
     def initialize(self) -> bool:
         try:
@@ -145,77 +421,136 @@ class OneNoteAPI:
                 raise RuntimeError('COM not available')
             admin = is_admin(); running = check_onenote_process()
             self.logger.info(f'权限: admin={admin}, running={running}')
+            # 须在 com_thread(create=False) 内调用：COM已在本线程初始化，创建的代理只属于本线程
             # 尝试三种COM
-            try:
-                self.app = win32com.client.gencache.EnsureDispatch('OneNote.Application')
-                _ = self.app.GetHierarchy('', 1)
-                return True
-            except Exception as e:
-                self.logger.warning(f'gencache失败: {e}')
-            try:
-                self.app = win32com.client.Dispatch('OneNote.Application')
-                _ = self.app.GetHierarchy('', 1)
-                return True
-            except Exception as e:
-                self.logger.warning(f'Dispatch失败: {e}')
-            try:
-                self.app = comtypes.client.CreateObject('OneNote.Application')
-                _ = self.app.GetHierarchy('', 1)
-                return True
-            except Exception as e:
-                self.logger.warning(f'comtypes失败: {e}')
+            for name, factory in (('gencache', win32com.client.gencache.EnsureDispatch),
+                                  ('Dispatch', win32com.client.Dispatch),
+                                  ('comtypes', comtypes.client.CreateObject)):
+                try:
+                    app = factory('OneNote.Application')
+                    _ = app.GetHierarchy('', 1)
+                    self.app = self._tls.app = app
+                    self._app_factory = factory
+                    return True
+                except Exception as e:
+                    self.logger.warning(f'{name}失败: {e}')
             # 退到仅PS
-            self.app = None
+            self.app = self._app_factory = None
+            self._tls.__dict__.pop('app', None)
             return True
         except Exception as e:
             self.logger.error(f'初始化失败: {e}')
             return False
 
-    def _ps(self, script: str) -> str:
-        f = Path(self.temp_dir) / 'tmp.ps1'
-        f.write_text(script, encoding='utf-8')
-        r = subprocess.run(['powershell', '-ExecutionPolicy', 'Bypass', '-File', str(f)], capture_output=True, text=True, encoding='utf-8', errors='replace')
-        return (r.stdout or '')
+    @contextmanager
+    def com_thread(self, create: bool = True):
+        """在当前线程初始化COM；create为True时按initialize成功的方式为本线程创建OneNote对象
+        （由initialize自行创建时传False）。离开时释放本线程的对象并反初始化。
+        本线程没有可用对象时只走PowerShell"""
+        if not COM_AVAILABLE:
+            yield
+            return
+        pythoncom.CoInitialize()
+        try:
+            if create and self._app_factory:
+                try:
+                    self._tls.app = self._app_factory('OneNote.Application')
+                except Exception as e:
+                    self.logger.warning(f'工作线程创建COM对象失败: {e}')
+            yield
+        finally:
+            app = self._tls.__dict__.pop('app', None)
+            if app is not None and app is self.app:
+                self.app = None
+            app = None
+            pythoncom.CoUninitialize()
+
+    def _com_app(self):
+        """当前线程可用的OneNote对象（只在本线程的_tls中查找，线程ID被复用也不会取到别的线程的代理）；
+        不可用时为None"""
+        return getattr(self._tls, 'app', None)
+
+    def _ps_session(self) -> subprocess.Popen:
+        """启动（或复用）常驻PowerShell进程，OneNote COM对象只创建一次"""
+        if self._ps_proc is not None and self._ps_proc.poll() is None:
+            return self._ps_proc
+        self._ps_proc = subprocess.Popen(
+            ['powershell', '-NoLogo', '-NoProfile', '-NonInteractive',
+             '-ExecutionPolicy', 'Bypass', '-OutputFormat', 'Text', '-Command', '-'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding='utf-8', errors='replace',
+            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+        self._ps_proc.stdin.write('[Console]::OutputEncoding=[System.Text.Encoding]::UTF8; $o=$null\n')
+        self._ps_proc.stdin.flush()
+        return self._ps_proc
+
+    def _ps(self, command: str) -> str:
+        """在常驻会话中执行单行命令，读取输出直到结束标记"""
+        marker = f'<<END>>{uuid.uuid4().hex}'
+        with self._ps_lock:
+            for attempt in range(2):
+                try:
+                    proc = self._ps_session()
+                    proc.stdin.write(f"{command}; Write-Output '{marker}'\n")
+                    proc.stdin.flush()
+                    lines = []
+                    for line in proc.stdout:
+                        if line.rstrip('\r\n') == marker:
+                            return ''.join(lines)
+                        lines.append(line)
+                    raise RuntimeError('PowerShell会话意外退出')
+                except Exception as e:
+                    self.logger.warning(f'PowerShell会话失败(第{attempt+1}次): {e}')
+                    self.close()
+        return ''
 
-    def _get_hierarchy_ps(self, obj_id: str, scope: int) -> str:
-        obj = obj_id.replace('"','""') if obj_id else ''
-        sc = scope
-        script = f"""
-        [Console]::OutputEncoding=[System.Text.Encoding]::UTF8
-        try {{
-          $o=New-Object -ComObject OneNote.Application
-          $x=""
-          $o.GetHierarchy("{obj}",{sc},[ref]$x)
-          Write-Output "SUCCESS:$x"
-        }} catch {{ Write-Output "ERROR:$($_.Exception.Message)" }}
-        """
+    def _ps_call(self, call: str) -> str:
+        script = ("try { if (-not $o) { $o=New-Object -ComObject OneNote.Application }; $x=''; "
+                  f"$o.{call}; Write-Output \"SUCCESS:$x\" }} "
+                  "catch { $o=$null; Write-Output \"ERROR:$($_.Exception.Message)\" }")
         out = self._ps(script).strip()
         if out.startswith('SUCCESS:'): return out[8:]
         return ''
 
+    def _get_hierarchy_ps(self, obj_id: str, scope: int) -> str:
+        obj = obj_id.replace('"','""') if obj_id else ''
+        return self._ps_call(f'GetHierarchy("{obj}",{scope},[ref]$x)')
+
     def _get_page_ps(self, page_id: str) -> str:
         pid = page_id.replace('"','""')
-        script = f"""
-        [Console]::OutputEncoding=[System.Text.Encoding]::UTF8
-        try {{
-          $o=New-Object -ComObject OneNote.Application
-          $x=""
-          $o.GetPageContent("{pid}",[ref]$x,7)
-          Write-Output "SUCCESS:$x"
-        }} catch {{ Write-Output "ERROR:$($_.Exception.Message)" }}
-        """
-        out = self._ps(script).strip()
-        if out.startswith('SUCCESS:'): return out[8:]
-        return ''
+        return self._ps_call(f'GetPageContent("{pid}",[ref]$x,7)')
 
-    def get_notebooks(self) -> Dict:
-        """获取笔记本列表，优化版本"""
+    def close(self):
+        """结束常驻PowerShell进程"""
+        proc, self._ps_proc = self._ps_proc, None
+        if proc is None:
+            return
+        try:
+            if proc.poll() is None:
+                proc.stdin.write('exit\n')
+                proc.stdin.flush()
+                proc.wait(2)
+        except Exception:
+            proc.kill()
+
+    def invalidate_notebooks(self):
+        """清空笔记本层级缓存（用户手动刷新时调用）"""
+        self._nb_cache = None
+
+    def get_notebooks(self, force: bool = False) -> Dict:
+        """获取笔记本列表，优化版本；TTL内返回缓存结果"""
+        if (not force and self._nb_cache is not None
+                and time.monotonic() - self._nb_cache_ts < self.HIERARCHY_TTL):
+            return self._nb_cache
+        
         xml = ''
         try:
-            if self.app:
+            app = self._com_app()
+            if app:
                 try:
                     # COM调用可能很慢，但在子线程中执行，不会阻塞UI
-                    xml = self.app.GetHierarchy('', 4)
+                    with self._app_lock:
+                        xml = app.GetHierarchy('', 4)
                 except Exception:
                     pass
             if not xml:
@@ -228,64 +563,63 @@ class OneNoteAPI:
         
         # 解析XML - 优化版本
         try:
-            root = ET.fromstring(xml)
+            root = parse_xml(xml)
         except Exception:
             return {}
         
-        def findall_local(p, name):
-            return [e for e in p.iter() if (isinstance(e.tag,str) and (e.tag.endswith('}'+name) or e.tag==name or e.tag.split('}')[-1]==name))]
-        
-        notebooks={}
-        for nb in findall_local(root, 'Notebook'):
-            nb_id = nb.get('ID')
-            nb_name = nb.get('name')
-            if not nb_id or not nb_name: 
-                continue
-            
-            sections={}
-            for sec in findall_local(nb,'Section'):
-                sid = sec.get('ID')
-                sname = sec.get('name')
-                if not sid or not sname: 
-                    continue
-                
-                pages={}
-                for pg in findall_local(sec,'Page'):
-                    pid = pg.get('ID')
-                    pname = pg.get('name')
-                    if pid and pname:
-                        pages[pid] = {'id':pid, 'name':pname}
-                
-                sections[sid] = {'id':sid, 'name':sname, 'pages':pages}
-            
-            notebooks[nb_id] = {'id':nb_id, 'name':nb_name, 'sections':sections}
-        
+        # 笔记本、页面只取直接子元素；分区可能嵌在分区组里，仍按后代查找
+        def pages_of(sec):
+            return {pid: {'id': pid, 'name': pname}
+                    for pg in sec.iterfind('{*}Page')
+                    if (pid := pg.get('ID')) and (pname := pg.get('name'))}
+
+        def sections_of(nb):
+            return {sid: {'id': sid, 'name': sname, 'pages': pages_of(sec)}
+                    for sec in iter_local(nb, 'Section')
+                    if (sid := sec.get('ID')) and (sname := sec.get('name'))}
+
+        notebooks = {nb_id: {'id': nb_id, 'name': nb_name, 'sections': sections_of(nb)}
+                     for nb in root.iterfind('{*}Notebook')
+                     if (nb_id := nb.get('ID')) and (nb_name := nb.get('name'))}
+        if notebooks:
+            self._nb_cache, self._nb_cache_ts = notebooks, time.monotonic()
         return notebooks
 
     def get_page_content(self, page_id: str) -> str:
-        if self.app:
-            try:
-                c = self.app.GetPageContent(page_id, 7)
-                if c and c.strip(): return c
-            except Exception:
-                pass
-            try:
-                x=''; self.app.GetPageContent(page_id, x, 7)
-                if x and x.strip(): return x
-            except Exception:
-                pass
+        app = self._com_app()
+        if app:
+            with self._app_lock:
+                try:
+                    c = app.GetPageContent(page_id, 7)
+                    if c and c.strip(): return c
+                except Exception:
+                    pass
+                try:
+                    x=''; app.GetPageContent(page_id, x, 7)
+                    if x and x.strip(): return x
+                except Exception:
+                    pass
         return self._get_page_ps(page_id)
 
 
 # ======= 解析器（Word / PDF） =======
 class OneNoteContentParser:
+    # 字体只在进程内注册一次，所有解析器实例共用
+    _fonts_registered = False
+    chinese_font = 'Helvetica'
+
     def __init__(self):
         self.logger = logging.getLogger('Parser')
         self.temp_files: List[str] = []
         self._setup_chinese_fonts()
     
-    def _setup_chinese_fonts(self):
-        """设置中文字体支持"""
+    @classmethod
+    def _setup_chinese_fonts(cls):
+        """设置中文字体支持（仅首次调用时探测并注册）"""
+        if cls._fonts_registered:
+            return
+        cls._fonts_registered = True
+        logger = logging.getLogger('Parser')
         try:
             # 尝试注册系统中文字体
             chinese_fonts = [
@@ -295,25 +629,25 @@ class OneNoteContentParser:
                 ('PingFang SC', 'C:/Windows/Fonts/PingFang.ttc'),
             ]
             
-            self.chinese_font = None
+            cls.chinese_font = None
             for font_name, font_path in chinese_fonts:
                 if os.path.exists(font_path):
                     try:
                         pdfmetrics.registerFont(TTFont(font_name, font_path))
-                        self.chinese_font = font_name
-                        self.logger.info(f"成功注册中文字体: {font_name}")
+                        cls.chinese_font = font_name
+                        logger.info(f"成功注册中文字体: {font_name}")
                         break
                     except Exception as e:
-                        self.logger.debug(f"注册字体{font_name}失败: {e}")
+                        logger.debug(f"注册字体{font_name}失败: {e}")
                         continue
             
-            if not self.chinese_font:
-                self.chinese_font = 'Helvetica'  # 回退到默认字体
-                self.logger.warning("未找到中文字体，使用默认字体")
+            if not cls.chinese_font:
+                cls.chinese_font = 'Helvetica'  # 回退到默认字体
+                logger.warning("未找到中文字体，使用默认字体")
                 
         except Exception as e:
-            self.chinese_font = 'Helvetica'
-            self.logger.error(f"字体设置失败: {e}")
+            cls.chinese_font = 'Helvetica'
+            logger.error(f"字体设置失败: {e}")
     
     def cleanup_temp_files(self):
         """清理临时文件"""
@@ -325,41 +659,111 @@ class OneNoteContentParser:
                 self.logger.debug(f"清理临时文件失败: {e}")
         self.temp_files.clear()
 
+    # --- 批量导出 ---
+    def _render_page(self, xml: str, page_name: str, out_stem: Path, docx: bool, pdf: bool,
+                     include_images: bool, include_attachments: bool):
+        """渲染单个页面，返回(页面名, Word结果, PDF结果)，未请求的格式为None"""
+        att = out_stem.parent / f'{out_stem.name}_attachments' if include_attachments else None
+        word_ok = pdf_ok = None
+        # 两种格式都要时只解析一次，标签索引与图片/附件数据共用
+        parsed = None
+        if docx and pdf:
+            try:
+                parsed = stream_page(xml, include_images, include_attachments)
+            except Exception as e:
+                self.logger.debug(f'预解析失败，改为各自解析: {e}')
+        if docx:
+            # Word: 内嵌附件
+            word_ok = self.parse_page_to_docx(xml, page_name, str(out_stem.parent / f'{out_stem.name}.docx'),
+                                              include_images=include_images,
+                                              include_attachments=include_attachments,
+                                              embed_attachments=True,
+                                              attachments_output_dir=att,
+                                              parsed=parsed)
+        if pdf:
+            # PDF: 附件保存到目录
+            pdf_ok = self.parse_page_to_pdf(xml, page_name, str(out_stem.parent / f'{out_stem.name}.pdf'),
+                                            include_images=include_images,
+                                            include_attachments=include_attachments,
+                                            attachments_output_dir=att,
+                                            parsed=parsed)
+        return page_name, word_ok, pdf_ok
+
+    def _render_task(self, *args):
+        """线程池任务：每个任务使用独立的解析器实例（temp_files等状态不跨线程共享），
+        页面完成后即清理其临时图片"""
+        parser = type(self)()
+        try:
+            return parser._render_page(*args)
+        finally:
+            parser.cleanup_temp_files()
+
+    def parse_pages_batch(self, pages, fetch, docx: bool = True, pdf: bool = True,
+                          include_images: bool = True, include_attachments: bool = False,
+                          max_workers: int = 8):
+        """批量导出(页面ID, 页面名, 输出路径前缀)：fetch在调用线程中串行执行（COM为STA），
+        各页的Word/PDF生成在线程池中并行；按完成顺序产出(页面名, Word结果, PDF结果)，空页面两项均为None"""
+        pages = list(pages)
+        if not pages:
+            return
+        workers = min(max_workers, len(pages))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for page_id, page_name, out_stem in pages:
+                xml = fetch(page_id)
+                if not xml:
+                    yield page_name, None, None
+                    continue
+                pending.add(pool.submit(self._render_task, xml, page_name, out_stem, docx, pdf,
+                                        include_images, include_attachments))
+                # 限制排队的页数，避免大量页面XML同时驻留内存
+                if len(pending) >= workers * 2:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        yield fut.result()
+            for fut in as_completed(pending):
+                yield fut.result()
+
     # --- 工具：命名空间无关查找 ---
     def _findall_local(self, parent: ET.Element, local_name: str) -> List[ET.Element]:
-        out=[]
-        for el in parent.iter():
-            tag = el.tag
-            if isinstance(tag,str) and (tag.endswith('}'+local_name) or tag==local_name or tag.split('}')[-1]==local_name):
-                if el is not parent or tag.split('}')[-1] != local_name:
-                    out.append(el)
-        return out
+        # 通配命名空间的标签过滤在C层完成，不再逐个元素比较字符串
+        return list(iter_local(parent, local_name))
 
     # --- Word ---
     def parse_page_to_docx(self, xml: str, page_name: str, out_path: str,
                            include_images=True, include_attachments=True,
                            embed_attachments=False,
-                           attachments_output_dir: Optional[Path]=None) -> bool:
+                           attachments_output_dir: Optional[Path]=None,
+                           parsed=None) -> bool:
         try:
-            root = ET.fromstring(xml)
+            # 只遍历一次，按标签名归类供各写入器使用；图片/附件数据在解析时即取出
+            # parsed: 调用方已解析好的(索引, 数据)，同一页面导出多种格式时共用
+            index, payloads = parsed or stream_page(xml, include_images,
+                                                    include_attachments and bool(attachments_output_dir))
             doc = Document()
+            # 单元格段落不跨页：在表格样式上设置一次，不逐段修改
+            try:
+                doc.styles['Table Grid'].paragraph_format.keep_together = True
+            except Exception:
+                pass
             doc.add_heading(page_name, level=1).alignment = WD_ALIGN_PARAGRAPH.CENTER
 
-            self._write_text_word(root, doc)
-            if include_images: self._images_word(root, doc)
+            self._write_text_word(index, doc)
+            if include_images: self._images_word(index, payloads, doc)
             if include_attachments and attachments_output_dir:
-                self._attachments_word(root, doc, attachments_output_dir, embed=embed_attachments)
-            self._tables_word(root, doc)
+                self._attachments_word(index, payloads, doc, attachments_output_dir, embed=embed_attachments)
+            # 表格只解析一次，正常页与横向页共用
+            tables = self._parse_tables_word(index)
+            self._tables_word(tables, doc)
 
             # 如检测到超宽表，额外加一页横向节重渲
             try:
-                first = self._collect_first_table_rows(root)
-                if first and len(first[0])>10:
+                if any(max(len(row) for row in rows) > 12 for rows in tables):
                     section = doc.add_section(WD_SECTION.NEW_PAGE)
                     section.orientation = WD_ORIENT.LANDSCAPE
                     w,h = section.page_height, section.page_width
                     section.page_width, section.page_height = w,h
-                    self._tables_word(root, doc, wide_mode=True)
+                    self._tables_word(tables, doc, wide_mode=True)
             except Exception:
                 pass
 
@@ -369,24 +773,24 @@ class OneNoteContentParser:
             self.logger.error(f'DOCX失败: {e}')
             return False
 
-    def _write_text_word(self, root: ET.Element, doc: Document):
+    def _write_text_word(self, index: Dict[str, List[ET.Element]], doc: Document):
         """改进的文本解析，保留OneNote格式"""
         # 查找所有OE（Outline Element）元素，保持结构
-        outlines = self._findall_local(root, 'OE')
+        outlines = index['OE']
         if outlines:
             for oe in outlines:
                 self._process_outline_element(oe, doc)
         else:
             # 兼容旧格式
-            ts = self._findall_local(root,'T')
+            ts = index['T']
             for t in ts:
                 if t.text:
                     txt = html.unescape(t.text)
-                    txt = re.sub(r'<[^>]+>','',txt)
+                    txt = strip_tags(txt)
                     if txt.strip():
                         p = doc.add_paragraph()
                         # 检查格式
-                        parent = t.getparent() if hasattr(t, 'getparent') else None
+                        parent = t.getparent() if HAS_GETPARENT else None
                         if parent is not None:
                             run = p.add_run(txt)
                             self._apply_formatting(parent, run)
@@ -410,7 +814,7 @@ class OneNoteContentParser:
         for t in ts:
             if t.text:
                 txt = html.unescape(t.text)
-                txt = re.sub(r'<[^>]+>','',txt)
+                txt = strip_tags(txt)
                 if txt.strip():
                     p = doc.add_paragraph()
                     # 应用缩进
@@ -418,7 +822,7 @@ class OneNoteContentParser:
                         p.paragraph_format.left_indent = Inches(indent * 0.5)
                     
                     # 检查并应用样式
-                    parent = t.getparent() if hasattr(t, 'getparent') else None
+                    parent = t.getparent() if HAS_GETPARENT else None
                     run = p.add_run(txt)
                     if parent is not None:
                         self._apply_formatting(parent, run)
@@ -446,49 +850,24 @@ class OneNoteContentParser:
         except:
             pass
 
-    def _images_word(self, root: ET.Element, doc: Document):
+    def _images_word(self, index: Dict[str, List[ET.Element]], payloads: Dict, doc: Document):
         """Word图片处理，智能调整图片大小"""
-        imgs = self._findall_local(root, 'Image')
+        imgs = index['Image']
         
         for im in imgs:
-            # 提取图片数据
-            data = None
-            for attr in ('data', 'Data', 'binaryData'):
-                v = im.get(attr)
-                if v:
-                    try: 
-                        data = base64.b64decode(v)
-                        break
-                    except Exception: 
-                        pass
-                        
-            if not data:
-                for c in im:
-                    if isinstance(c.tag, str) and ('Data' in c.tag or c.tag.endswith('Data')) and c.text:
-                        try: 
-                            data = base64.b64decode(c.text)
-                            break
-                        except Exception: 
-                            pass
-                            
+            # 图片数据已在解析时取出
+            data = payloads.get(im)
             if not data: 
                 continue
                 
-            # 创建临时图片文件
-            fd, fp = tempfile.mkstemp(suffix='.png')
-            os.close(fd)
-            Path(fp).write_bytes(data)
-            self.temp_files.append(fp)
-            
             try:
-                # 获取图片尺寸进行智能缩放
-                try:
-                    from PIL import Image as PILImage
-                    with PILImage.open(fp) as pil_img:
-                        orig_width, orig_height = pil_img.size
-                        aspect_ratio = orig_height / orig_width
-                except ImportError:
-                    # 没有PIL时使用默认比例
+                # 获取图片尺寸进行智能缩放（只读文件头，不解码）
+                size = image_size(data)
+                if size:
+                    orig_width, orig_height = size
+                    aspect_ratio = orig_height / orig_width
+                else:
+                    # 无法识别尺寸时使用默认比例
                     aspect_ratio = 0.75
                     orig_width = 800
                 
@@ -511,21 +890,22 @@ class OneNoteContentParser:
                 if aspect_ratio > 1.5:  # 高图片
                     display_width = min(display_width, max_width * 0.7)
                 
-                doc.add_picture(fp, width=Inches(display_width))
+                # 数据已在内存中，直接交给python-docx，无需临时文件
+                doc.add_picture(io.BytesIO(data), width=Inches(display_width))
                 doc.add_paragraph()
                 
             except Exception as e:
                 self.logger.warning(f"添加图片失败: {e}")
                 # 回退到默认处理
                 try:
-                    doc.add_picture(fp, width=Inches(5))
+                    doc.add_picture(io.BytesIO(data), width=Inches(5))
                     doc.add_paragraph()
                 except Exception:
                     pass
 
-    def _attachments_word(self, root: ET.Element, doc: Document, out_dir: Path, embed=False):
+    def _attachments_word(self, index: Dict[str, List[ET.Element]], payloads: Dict, doc: Document, out_dir: Path, embed=False):
         """处理Word附件，支持内嵌和外链两种模式"""
-        files = self._findall_local(root,'InsertedFile')
+        files = index['InsertedFile']
         if not files:
             return
             
@@ -534,7 +914,7 @@ class OneNoteContentParser:
         
         for a in files:
             name = a.get('pathName','attachment')
-            data = self._extract_attachment(a)
+            data = payloads.get(a)
             if not data: 
                 continue
             
@@ -547,8 +927,8 @@ class OneNoteContentParser:
                     # 先保存到临时文件
                     import tempfile
                     fd, temp_path = tempfile.mkstemp(suffix=Path(name).suffix)
-                    os.close(fd)
-                    Path(temp_path).write_bytes(data)
+                    with os.fdopen(fd, 'wb') as fh:
+                        fh.write(data)
                     
                     # 创建嵌入式链接文本
                     run2 = para.add_run(f'[内嵌附件] {name}')
@@ -591,22 +971,10 @@ class OneNoteContentParser:
         t = OxmlElement('w:t'); t.text=text; r.append(t); link.append(r)
         para._p.append(link)
 
-    def _extract_attachment(self, elem: ET.Element) -> Optional[bytes]:
-        d = elem.get('binaryData')
-        if d:
-            try: return base64.b64decode(d)
-            except Exception: pass
-        for c in elem:
-            if isinstance(c.tag,str) and ('Data' in c.tag or c.tag.endswith('Data')) and c.text:
-                try: return base64.b64decode(c.text)
-                except Exception: pass
-        return None
-
-    def _tables_word(self, root: ET.Element, doc: Document, wide_mode: bool=False):
-        """修复Word表格处理，避免重复和格式问题"""
-        tables = self._findall_local(root, 'Table')
-        
-        for tb in tables:
+    def _parse_tables_word(self, index: Dict[str, List[ET.Element]]) -> List[List[List[str]]]:
+        """解析页面中的全部表格，返回去重后的行数据（空表跳过）"""
+        parsed = []
+        for tb in index['Table']:
             rows = self._parse_table_rows_clean(tb)
             if not rows: 
                 continue
@@ -615,16 +983,22 @@ class OneNoteContentParser:
             unique_rows = []
             seen_rows = set()
             for row in rows:
-                row_key = '|'.join(row)
+                row_key = tuple(row)
                 if row_key not in seen_rows:
                     seen_rows.add(row_key)
                     unique_rows.append(row)
             
-            if not unique_rows:
-                continue
-                
-            max_cols = max(len(row) for row in unique_rows) if unique_rows else 1
+            if unique_rows:
+                parsed.append(unique_rows)
+        return parsed
+
+    def _tables_word(self, tables: List[List[List[str]]], doc: Document, wide_mode: bool=False):
+        """修复Word表格处理，避免重复和格式问题；横向页只重渲超宽表"""
+        for unique_rows in tables:
+            max_cols = max(len(row) for row in unique_rows)
             max_rows = len(unique_rows)
+            if wide_mode and max_cols <= 12:
+                continue
             
             # 处理宽表格
             if max_cols > 12:
@@ -657,32 +1031,28 @@ class OneNoteContentParser:
         except:
             pass
             
-        for i, row in enumerate(rows):
-            for j in range(min(cols_limit, len(row))):
-                if i < len(table.rows) and j < len(table.rows[i].cells):
-                    cell_text = row[j] if j < len(row) else ''
-                    cell = table.rows[i].cells[j]
-                    # 清理文本
-                    clean_text = self._clean_cell_text_for_word(cell_text)
-                    cell.text = clean_text
-                    
-                    # 设置单元格格式
-                    for paragraph in cell.paragraphs:
-                        paragraph.paragraph_format.word_wrap = True
-                        paragraph.paragraph_format.keep_together = True
+        # 先完成全部文本清理，写表循环内只操作docx
+        clean_rows = [[self._clean_cell_text_for_word(t) for t in row[:cols_limit]] for row in rows]
+        # table.rows / row.cells 每次访问都会重新遍历XML，只取一次
+        for table_row, data_row in zip(table.rows, clean_rows):
+            for cell, clean_text in zip(table_row.cells, data_row):
+                cell.text = clean_text
     
     def _clean_cell_text_for_word(self, text: str) -> str:
         """清理Word单元格文本"""
         if not text:
             return ""
+        # 快速路径：无实体、无标签、无连续空格且不含换行/制表/特殊空白（isprintable为假）时无需清理
+        if '<' not in text and '&' not in text and '  ' not in text and text.isprintable():
+            return text.strip()
         
         # 去除HTML标签和转义字符
         text = html.unescape(text)
-        text = re.sub(r'<[^>]+>', '', text)
+        text = strip_tags(text)
         
         # 处理换行，避免单元格内换行
         text = text.replace('\r\n', ' ').replace('\r', ' ').replace('\n', ' ')
-        text = re.sub(r'\s+', ' ', text)
+        text = _RE_WS.sub(' ', text)
         text = text.strip()
         
         return text
@@ -716,7 +1086,7 @@ class OneNoteContentParser:
         for t_elem in self._findall_local(cell_elem, 'T'):
             if t_elem.text:
                 clean_text = html.unescape(t_elem.text).strip()
-                clean_text = re.sub(r'<[^>]+>', '', clean_text)
+                clean_text = strip_tags(clean_text)
                 
                 if clean_text and clean_text not in seen_texts:
                     seen_texts.add(clean_text)
@@ -726,70 +1096,20 @@ class OneNoteContentParser:
         result = ' '.join(text_parts)
         
         # 最终清理
-        result = re.sub(r'\s+', ' ', result).strip()
+        result = _RE_WS.sub(' ', result).strip()
         
         return result
 
-    def _parse_table_rows(self, table_elem: ET.Element) -> List[List[str]]:
-        """解析表格行，改进文本提取避免换行乱格式"""
-        rows = []
-        for r in self._findall_local(table_elem, 'Row'):
-            row = []
-            for c in self._findall_local(r, 'Cell'):
-                # 更全面的文本提取
-                cell_text = self._extract_all_cell_text_word(c)
-                row.append(cell_text)
-            if row: 
-                rows.append(row)
-        return rows
-    
-    def _extract_all_cell_text_word(self, cell_elem: ET.Element) -> str:
-        """为Word表格提取单元格文本，处理换行和格式"""
-        try:
-            text_parts = []
-            
-            # 递归查找所有文本内容
-            def collect_text_recursive(elem):
-                if elem.text and elem.text.strip():
-                    text_parts.append(elem.text.strip())
-                
-                for child in elem:
-                    collect_text_recursive(child)
-                    if child.tail and child.tail.strip():
-                        text_parts.append(child.tail.strip())
-            
-            # 专门查找T元素（OneNote文本元素）
-            for t_elem in self._findall_local(cell_elem, 'T'):
-                if t_elem.text:
-                    clean_text = html.unescape(t_elem.text)
-                    clean_text = re.sub(r'<[^>]+>', '', clean_text)
-                    clean_text = clean_text.strip()
-                    if clean_text:
-                        text_parts.append(clean_text)
-            
-            # 如果T元素没找到，用递归方法
-            if not text_parts:
-                collect_text_recursive(cell_elem)
-            
-            # 处理换行：将多个文本片段用空格连接，避免换行造成的格式问题
-            full_text = ' '.join([part for part in text_parts if part])
-            
-            # 清理多余的空白字符
-            full_text = re.sub(r'\s+', ' ', full_text)
-            full_text = full_text.strip()
-            
-            return full_text
-            
-        except Exception as e:
-            self.logger.debug(f"Word单元格文本提取失败: {e}")
-            return ""
-
     # --- PDF ---
     def parse_page_to_pdf(self, xml: str, page_name: str, out_path: str,
                           include_images=True, include_attachments=True,
-                          attachments_output_dir: Optional[Path]=None) -> bool:
+                          attachments_output_dir: Optional[Path]=None,
+                          parsed=None) -> bool:
         try:
-            root = ET.fromstring(xml)
+            # 只遍历一次，按标签名归类供各写入器使用；图片/附件数据在解析时即取出
+            # parsed: 调用方已解析好的(索引, 数据)，同一页面导出多种格式时共用
+            index, payloads = parsed or stream_page(xml, include_images,
+                                                    include_attachments and bool(attachments_output_dir))
             
             # 创建自定义样式，支持中文
             styles = getSampleStyleSheet()
@@ -834,12 +1154,12 @@ class OneNoteContentParser:
             story.append(Spacer(1, 12))
 
             # 解析内容
-            self._write_text_pdf_enhanced(root, story, normal_style)
+            self._write_text_pdf_enhanced(index, story, normal_style)
             if include_images: 
-                self._images_pdf_enhanced(root, story)
+                self._images_pdf_enhanced(index, payloads, story)
             if include_attachments and attachments_output_dir:
-                self._attachments_pdf(root, story, normal_style, attachments_output_dir)
-            self._tables_pdf_enhanced(root, story, normal_style)
+                self._attachments_pdf(index, payloads, story, normal_style, attachments_output_dir)
+            self._tables_pdf_enhanced(index, story, normal_style)
 
             doc.build(story)
             return True
@@ -847,17 +1167,18 @@ class OneNoteContentParser:
             self.logger.error(f'PDF生成失败: {e}')
             return False
     
-    def _write_text_pdf_enhanced(self, root: ET.Element, story: List, normal_style: ParagraphStyle):
+    def _write_text_pdf_enhanced(self, index: Dict[str, List[ET.Element]], story: List, normal_style: ParagraphStyle):
         """增强版PDF文本处理，更好地支持中文和格式"""
         try:
             # 查找所有文本元素，保持层次结构
-            outlines = self._findall_local(root, 'OE')
+            outlines = index['OE']
             if outlines:
+                indent_styles: Dict[int, ParagraphStyle] = {}  # 每级缩进的样式只建一次
                 for oe in outlines:
-                    self._process_outline_pdf(oe, story, normal_style)
+                    self._process_outline_pdf(oe, story, normal_style, indent_styles)
             else:
                 # 兼容模式
-                text_elements = self._findall_local(root, 'T')
+                text_elements = index['T']
                 for t in text_elements:
                     if t.text:
                         text = self._clean_text_for_pdf(t.text)
@@ -867,17 +1188,17 @@ class OneNoteContentParser:
         except Exception as e:
             self.logger.error(f"PDF文本处理失败: {e}")
     
-    def _process_outline_pdf(self, oe: ET.Element, story: List, base_style: ParagraphStyle):
+    def _process_outline_pdf(self, oe: ET.Element, story: List, base_style: ParagraphStyle,
+                             indent_styles: Dict[int, ParagraphStyle]):
         """处理OneNote的大纲元素到PDF"""
         try:
             # 获取缩进级别
-            indent_level = 0
             list_elems = self._findall_local(oe, 'List')
-            if list_elems:
-                try:
-                    indent_level = int(list_elems[0].get('indent', '0'))
-                except:
-                    indent_level = 0
+            raw = list_elems[0].get('indent') if list_elems else None
+            try:
+                indent_level = int(raw) if raw else 0
+            except ValueError:
+                indent_level = 0
             
             # 处理文本
             text_elems = self._findall_local(oe, 'T')
@@ -885,79 +1206,62 @@ class OneNoteContentParser:
                 if t.text:
                     text = self._clean_text_for_pdf(t.text)
                     if text.strip():
-                        # 根据缩进创建样式
-                        indent_style = ParagraphStyle(
-                            f'Indent{indent_level}',
-                            parent=base_style,
-                            leftIndent=indent_level * 20,  # 每级缩进20点
-                            bulletIndent=indent_level * 15 if indent_level > 0 else 0
-                        )
+                        # 根据缩进创建样式（同一次导出内按缩进级别复用）
+                        indent_style = indent_styles.get(indent_level)
+                        if indent_style is None:
+                            indent_style = indent_styles[indent_level] = ParagraphStyle(
+                                f'Indent{indent_level}',
+                                parent=base_style,
+                                leftIndent=indent_level * 20,  # 每级缩进20点
+                                bulletIndent=indent_level * 15 if indent_level > 0 else 0
+                            )
                         story.append(Paragraph(text, indent_style))
                         story.append(Spacer(1, 3))
         except Exception as e:
             self.logger.debug(f"大纲处理失败: {e}")
     
-    def _clean_text_for_pdf(self, text: str) -> str:
-        """清理文本用于PDF显示"""
+    @staticmethod
+    @lru_cache(maxsize=8192)
+    def _clean_text_for_pdf(text: str) -> str:
+        """清理文本用于PDF显示（纯函数，重复文本直接命中缓存）"""
         if not text:
             return ""
         
         # HTML解码
         text = html.unescape(text)
         # 移除HTML标签
-        text = re.sub(r'<[^>]+>', '', text)
+        text = strip_tags(text)
         # 处理换行和空白
         text = text.replace('\r\n', '\n').replace('\r', '\n')
-        text = re.sub(r'[\t\x0b\x0c]+', ' ', text)
+        text = _RE_HSPACE.sub(' ', text)
         # 去除首尾空白但保留内部结构
         text = text.strip()
         
         return text
     
-    def _images_pdf_enhanced(self, root: ET.Element, story: List):
+    def _images_pdf_enhanced(self, index: Dict[str, List[ET.Element]], payloads: Dict, story: List):
         """增强版图片处理，支持全屏显示"""
         try:
-            imgs = self._findall_local(root, 'Image')
+            imgs = index['Image']
             
             for im in imgs:
-                # 提取图片数据
-                data = None
-                for attr in ('data', 'Data', 'binaryData'):
-                    v = im.get(attr)
-                    if v:
-                        try: 
-                            data = base64.b64decode(v)
-                            break
-                        except Exception: 
-                            pass
-                            
-                if not data:
-                    for c in im:
-                        if isinstance(c.tag, str) and ('Data' in c.tag or c.tag.endswith('Data')) and c.text:
-                            try: 
-                                data = base64.b64decode(c.text)
-                                break
-                            except Exception: 
-                                pass
-                
+                # 图片数据已在解析时取出；PDF是最后一个使用者，取出后即从字典移除，
+                # 写入临时文件后不再在内存中保留到doc.build
+                data = payloads.pop(im, None)
                 if not data:
                     continue
                     
                 # 创建临时图片文件
                 fd, temp_img = tempfile.mkstemp(suffix='.png')
-                os.close(fd)
                 self.temp_files.append(temp_img)
                 
                 try:
-                    Path(temp_img).write_bytes(data)
+                    with os.fdopen(fd, 'wb') as fh:  # 直接写已打开的句柄，免去二次打开
+                        fh.write(data)
                     
-                    # 获取图片尺寸
-                    try:
-                        from PIL import Image as PILImage
-                        with PILImage.open(temp_img) as pil_img:
-                            orig_width, orig_height = pil_img.size
-                    except ImportError:
-                        orig_width, orig_height = 600, 400
+                    # 获取图片尺寸（只读文件头，不解码）
+                    orig_width, orig_height = image_size(data) or (600, 400)
+                    data = None
                     
                     # 计算合适的显示尺寸
                     page_width = A4[0] - 3*cm  # 窄边距
@@ -996,10 +1300,10 @@ class OneNoteContentParser:
         except Exception as e:
             self.logger.error(f"PDF图片处理失败: {e}")
     
-    def _attachments_pdf(self, root: ET.Element, story: List, normal_style: ParagraphStyle, out_dir: Path):
+    def _attachments_pdf(self, index: Dict[str, List[ET.Element]], payloads: Dict, story: List, normal_style: ParagraphStyle, out_dir: Path):
         """PDF附件处理：保存到目录并在文档中添加引用"""
         try:
-            files = self._findall_local(root, 'InsertedFile')
+            files = index['InsertedFile']
             if not files:
                 return
                 
@@ -1019,16 +1323,19 @@ class OneNoteContentParser:
             story.append(Paragraph('📎 附件列表', heading_style))
             story.append(Spacer(1, 6))
             
+            written = set()  # (文件名, 内容摘要)：同一附件重复嵌入时只写一次
             for a in files:
                 name = a.get('pathName', 'attachment')
-                data = self._extract_attachment(a)
+                data = payloads.get(a)
                 if not data:
                     continue
                 
                 try:
                     # 保存附件到目录
-                    p = out_dir / name
-                    p.write_bytes(data)
+                    key = (name, hashlib.blake2b(data, digest_size=16).digest())
+                    if key not in written:
+                        (out_dir / name).write_bytes(data)
+                        written.add(key)
                     
                     # 在PDF中添加附件信息
                     info = f"• {name} (已保存到附件目录)"
@@ -1039,10 +1346,10 @@ class OneNoteContentParser:
         except Exception as e:
             self.logger.error(f"附件处理失败: {e}")
             
-    def _tables_pdf_enhanced(self, root: ET.Element, story: List, normal_style: ParagraphStyle):
+    def _tables_pdf_enhanced(self, index: Dict[str, List[ET.Element]], story: List, normal_style: ParagraphStyle):
         """增强版PDF表格处理，完整保留数据并支持中文"""
         try:
-            table_elements = self._findall_local(root, 'Table')
+            table_elements = index['Table']
             if not table_elements:
                 return
             
@@ -1070,41 +1377,62 @@ class OneNoteContentParser:
                 fontWeight='bold'
             )
             
+            # 分段标题与截断提示样式对整页表格都相同，提前建好
+            title_style = ParagraphStyle(
+                'SegmentTitle',
+                parent=normal_style,
+                fontSize=10,
+                textColor=colors.darkblue,
+                spaceAfter=3,
+                spaceBefore=6
+            )
+            
+            note_style = ParagraphStyle(
+                'TruncateNote',
+                parent=normal_style,
+                fontSize=8,
+                textColor=colors.red,
+                fontStyle='italic',
+                alignment=TA_RIGHT
+            )
+            
+            # 表格样式只与字体有关，整页共用一个
+            table_style = TableStyle(_PDF_TABLE_STYLE + [
+                ('FONTNAME', (0, 0), (-1, -1), normal_style.fontName),
+            ])
+            
+            MAX_ROWS = 120  # 增加行数，减少表格数量
+            
             for table_idx, table_elem in enumerate(table_elements):
                 # 使用和Word相同的清理方法
                 rows_data = self._parse_table_rows_clean(table_elem)
                 if not rows_data:
                     continue
                 
-                # 去重处理，避免重复行
-                unique_rows = []
+                # 去重处理，避免重复行（元组作键，无需拼接字符串）；
+                # 凑满MAX_ROWS行即停止，超出部分不再去重和清理
                 seen_rows = set()
+                unique_rows = []
+                truncated = False
                 for row in rows_data:
-                    row_key = '|'.join(row)
-                    if row_key not in seen_rows:
-                        seen_rows.add(row_key)
-                        unique_rows.append(row)
+                    key = tuple(row)
+                    if key in seen_rows:
+                        continue
+                    if len(unique_rows) == MAX_ROWS:
+                        truncated = True
+                        break
+                    seen_rows.add(key)
+                    unique_rows.append(row)
                 
                 if not unique_rows:
                     continue
                 
-                # 数据预处理
-                cleaned_rows = []
-                max_cols = 0
-                
-                for row in unique_rows:
-                    cleaned_row = []
-                    for cell in row:
-                        # 清理文本用于PDF显示
-                        cleaned_text = self._clean_cell_text_for_pdf(cell)
-                        cleaned_row.append(cleaned_text)
-                    cleaned_rows.append(cleaned_row)
-                    max_cols = max(max_cols, len(cleaned_row))
-                
-                # 补齐所有行到相同列数
-                for row in cleaned_rows:
-                    while len(row) < max_cols:
-                        row.append('')
+                # 数据预处理：清理文本用于PDF显示，并一次性补齐所有行到相同列数
+                max_cols = max(len(row) for row in unique_rows)
+                clean = self._clean_cell_text_for_pdf
+                # 空单元格直接跳过清理（后面转Paragraph时统一补空格）
+                cleaned_rows = [[clean(cell) if cell else '' for cell in row] + [''] * (max_cols - len(row))
+                                for row in unique_rows]
                 
                 # 大幅简化分段策略，减少PDF页面混乱
                 if max_cols <= 8:
@@ -1113,15 +1441,6 @@ class OneNoteContentParser:
                     MAX_COLS_PER_SEGMENT = 8  # 12列以内分2段
                 else:
                     MAX_COLS_PER_SEGMENT = 6  # 超宽表格每段6列
-                    
-                MAX_ROWS = 120  # 增加行数，减少表格数量
-                
-                # 限制行数
-                if len(cleaned_rows) > MAX_ROWS:
-                    cleaned_rows = cleaned_rows[:MAX_ROWS]
-                    truncated = True
-                else:
-                    truncated = False
                 
                 # 计算分段
                 col_segments = list(range(0, max_cols, MAX_COLS_PER_SEGMENT))
@@ -1130,10 +1449,7 @@ class OneNoteContentParser:
                     end_col = min(start_col + MAX_COLS_PER_SEGMENT, max_cols)
                     
                     # 提取当前段的数据
-                    segment_data = []
-                    for row in cleaned_rows:
-                        segment_row = row[start_col:end_col]
-                        segment_data.append(segment_row)
+                    segment_data = [row[start_col:end_col] for row in cleaned_rows]
                     
                     if not segment_data:
                         continue
@@ -1162,14 +1478,6 @@ class OneNoteContentParser:
                             # 后续段只显示列范围
                             seg_title = f"续表 (列 {start_col + 1}-{end_col})"
                         
-                        title_style = ParagraphStyle(
-                            'SegmentTitle',
-                            parent=normal_style,
-                            fontSize=10,
-                            textColor=colors.darkblue,
-                            spaceAfter=3,
-                            spaceBefore=6
-                        )
                         story.append(Paragraph(seg_title, title_style))
                     
                     try:
@@ -1181,40 +1489,15 @@ class OneNoteContentParser:
                         # 创建表格
                         pdf_table = Table(table_flow, colWidths=col_widths, repeatRows=1)
                         
-                        # 简化表格样式，提高可读性
-                        table_style = TableStyle([
-                            # 外边框
-                            ('BOX', (0, 0), (-1, -1), 1, colors.black),
-                            # 内部网格线
-                            ('INNERGRID', (0, 0), (-1, -1), 0.3, colors.grey),
-                            # 垂直对齐
-                            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                            
-                            # 标题行样式
-                            ('BACKGROUND', (0, 0), (-1, 0), colors.darkgrey),
-                            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                            ('FONTSIZE', (0, 0), (-1, 0), 9),
-                            ('FONTNAME', (0, 0), (-1, 0), normal_style.fontName),
-                            
-                            # 数据行样式
-                            ('FONTSIZE', (0, 1), (-1, -1), 8),
-                            ('FONTNAME', (0, 1), (-1, -1), normal_style.fontName),
-                            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-                            
-                            # 合理的内边距
-                            ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                            ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                            ('TOPPADDING', (0, 0), (-1, -1), 3),
-                            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-                        ])
-                        
                         pdf_table.setStyle(table_style)
                         
-                        # 使用KeepInFrame确保表格适应页面
+                        # 超高的表格才用KeepInFrame缩放，放得下的直接加入，省去缩放计算
                         max_height = A4[1] - 6*cm  # 留出更多空间给页边距
-                        kif = KeepInFrame(available_width, max_height, [pdf_table], mode='shrink')
-                        story.append(kif)
+                        _, table_height = pdf_table.wrap(available_width, max_height)
+                        if table_height <= max_height:
+                            story.append(pdf_table)
+                        else:
+                            story.append(KeepInFrame(available_width, max_height, [pdf_table], mode='shrink'))
                         story.append(Spacer(1, 12))
                         
                     except Exception as render_err:
@@ -1227,14 +1510,6 @@ class OneNoteContentParser:
                 
                 # 如果表格被截断，添加提示
                 if truncated:
-                    note_style = ParagraphStyle(
-                        'TruncateNote',
-                        parent=normal_style,
-                        fontSize=8,
-                        textColor=colors.red,
-                        fontStyle='italic',
-                        alignment=TA_RIGHT
-                    )
                     story.append(Spacer(1, 3))
                     story.append(Paragraph(f'注：表格内容过多，已显示前{MAX_ROWS}行', note_style))
                     story.append(Spacer(1, 8))
@@ -1246,31 +1521,17 @@ class OneNoteContentParser:
     def _extract_all_cell_text(self, cell_elem: ET.Element) -> str:
         """提取单元格内的所有文本，包括嵌套元素"""
         try:
-            text_parts = []
-            
-            # 递归查找所有文本元素
-            def collect_text(elem):
-                if elem.text:
-                    text_parts.append(elem.text.strip())
-                
-                # 查找所有T元素（文本元素）
-                for t_elem in elem.findall('.//'):
-                    if t_elem.tag.endswith('T') or t_elem.tag == 'T':
-                        if t_elem.text:
-                            text_parts.append(t_elem.text.strip())
-                
-                # 也检查元素的tail文本
-                if elem.tail:
-                    text_parts.append(elem.tail.strip())
-            
-            collect_text(cell_elem)
+            # 单元格自身文本 + 所有T元素文本 + 尾部文本；T元素的筛选在lxml的C层完成
+            texts = [cell_elem.text]
+            texts.extend(t.text for t in iter_local(cell_elem, 'T'))
+            texts.append(cell_elem.tail)
             
             # 合并所有文本部分
-            full_text = ' '.join([part for part in text_parts if part])
+            full_text = ' '.join([s for s in (p.strip() for p in texts if p) if s])
             
             # 清理HTML和特殊字符
             full_text = html.unescape(full_text)
-            full_text = re.sub(r'<[^>]+>', '', full_text)
+            full_text = strip_tags(full_text)
             
             return full_text.strip()
             
@@ -1278,35 +1539,22 @@ class OneNoteContentParser:
             self.logger.debug(f"提取单元格文本失败: {e}")
             return ""
     
-    def _clean_cell_text_for_pdf(self, text: str) -> str:
-        """清理单元格文本用于PDF显示，处理换行乱格式"""
+    @staticmethod
+    @lru_cache(maxsize=8192)
+    def _clean_cell_text_for_pdf(text: str) -> str:
+        """清理单元格文本用于PDF显示，处理换行乱格式（纯函数，重复文本直接命中缓存）"""
         if not text:
             return " "
         
         # 基础清理
         text = html.unescape(text)
-        text = re.sub(r'<[^>]+>', '', text)
+        text = strip_tags(text)
         
-        # 智能处理换行：
-        # 1. 先将所有换行符替换为特殊标记
-        text = text.replace('\r\n', '<<<LINEBREAK>>>').replace('\r', '<<<LINEBREAK>>>').replace('\n', '<<<LINEBREAK>>>')
-        
-        # 2. 处理多余的空白，但保留段落分隔
-        text = re.sub(r'\s+', ' ', text)
-        
-        # 3. 恢复重要的换行为空格，避免单元格内换行乱格式
-        text = text.replace('<<<LINEBREAK>>>', ' ')
-        
-        # 4. 最终清理
-        text = re.sub(r'\s+', ' ', text)  # 压缩连续空格
-        text = text.strip()
+        # 换行与连续空白一并压缩为单个空格，避免单元格内换行乱格式
+        text = _RE_WS.sub(' ', text).strip()
         
-        # 处理特殊字符，确保PDF兼容性
-        text = text.replace('\u2022', '•')  # 项目符号
-        text = text.replace('\u2013', '-')  # en-dash
-        text = text.replace('\u2014', '—')  # em-dash
-        text = text.replace('\u201c', '"').replace('\u201d', '"')  # 引号
-        text = text.replace('\u2018', "'").replace('\u2019', "'")  # 单引号
+        # 处理特殊字符，确保PDF兼容性（一次遍历完成全部替换）
+        text = text.translate(_PDF_PUNCT)
         
         # 限制长度，但保留更多内容
         MAX_CELL_LENGTH = 300  # 增加限制长度
@@ -1325,7 +1573,7 @@ class OneNoteContentParser:
         buf=[]
         for t in ts:
             if t.text:
-                s = html.unescape(t.text); s=re.sub(r'<[^>]+>','',s)
+                s = html.unescape(t.text); s=strip_tags(s)
                 buf.append(s)
         for line in '\n'.join(buf).split('\n'):
             if line.strip():
@@ -1347,8 +1595,8 @@ class OneNoteContentParser:
                         try: data=base64.b64decode(c.text); break
                         except Exception: pass
             if not data: continue
-            fd, fp = tempfile.mkstemp(suffix='.png'); os.close(fd)
-            Path(fp).write_bytes(data)
+            fd, fp = tempfile.mkstemp(suffix='.png')
+            with os.fdopen(fd, 'wb') as fh: fh.write(data)
             img = RLImage(fp, width=4*inch, height=3*inch)
             story.append(img); story.append(Spacer(1, 12))
 
@@ -1363,11 +1611,11 @@ class OneNoteContentParser:
                                    leftIndent=0, rightIndent=0)
         
         def clean(s:str)->str:
-            s=html.unescape(s); s=re.sub(r'<[^>]+>','',s); 
+            s=html.unescape(s); s=strip_tags(s); 
             return s.strip()
         
         for tb in tbls:
-            rows = self._parse_table_rows(tb)
+            rows = self._parse_table_rows_clean(tb)
             if not rows: continue
             
             # 预处理数据
@@ -1457,6 +1705,139 @@ class OneNoteContentParser:
 
 
 # ======= GUI =======
+# 主窗口样式表（模块级常量，只构建一次）
+_MAIN_QSS = """
+/* 分组框 */
+QGroupBox { 
+    background: white;
+    border: 1px solid #e5e7eb;
+    border-radius: 8px; 
+    padding: 15px; 
+    margin-top: 12px;
+    font-size: 14px;
+}
+
+QGroupBox::title { 
+    subcontrol-origin: margin; 
+    left: 12px; 
+    padding: 0 8px; 
+    color: #1f2937; 
+    font-weight: 600;
+    background: white;
+}
+
+/* 标题 */
+QLabel#title_label { 
+    font-size: 20px; 
+    font-weight: 700; 
+    color: #1f2937; 
+    background: white;
+    padding: 10px;
+    border: 1px solid #e5e7eb;
+    border-radius: 6px;
+}
+
+/* 按钮 */
+QPushButton { 
+    background: #3b82f6;
+    color: white; 
+    border: none;
+    padding: 10px 16px; 
+    border-radius: 6px; 
+    font-weight: 600;
+    font-size: 13px;
+}
+
+QPushButton:hover { 
+    background: #2563eb;
+}
+
+QPushButton:disabled { 
+    background: #e5e7eb; 
+    color: #9ca3af;
+}
+
+/* 树控件 - 简洁样式，保留默认展开图标 */
+QTreeWidget { 
+    background: white;
+    border: 1px solid #e5e7eb;
+    border-radius: 6px;
+    font-size: 13px;
+    color: #374151;
+    outline: none;
+}
+
+QHeaderView::section {
+    background: #f9fafb;
+    color: #374151;
+    border: none;
+    border-right: 1px solid #e5e7eb;
+    padding: 8px;
+    font-weight: 600;
+}
+
+QTreeWidget::item {
+    background: white;
+    color: #374151;
+    padding: 6px;
+    height: 26px;
+}
+
+QTreeWidget::item:hover {
+    background: #f3f4f6;
+}
+
+QTreeWidget::item:selected {
+    background: #dbeafe;
+    color: #1e40af;
+}
+
+/* 复选框 */
+QCheckBox::indicator {
+    width: 16px;
+    height: 16px;
+    border: 1px solid #d1d5db;
+    border-radius: 3px;
+    background: white;
+}
+
+QCheckBox::indicator:checked {
+    background: #3b82f6;
+    border: 1px solid #3b82f6;
+}
+
+/* 日志区域 - 白色背景 */
+QTextEdit#log { 
+    background: white;
+    color: #374151; 
+    border: 1px solid #e5e7eb;
+    border-radius: 6px;
+    font-family: 'Consolas', monospace;
+    font-size: 11px;
+    padding: 8px;
+}
+
+/* 进度条 */
+QProgressBar { 
+    border: 1px solid #e5e7eb;
+    border-radius: 6px; 
+    height: 22px; 
+    text-align: center;
+    background: white;
+    color: #374151;
+}
+
+QProgressBar::chunk { 
+    background: #10b981;
+    border-radius: 4px;
+    margin: 1px;
+}
+"""
+
+# 树节点 UserRole 数据为 (类型, ID, 名称) 三元组，类型取以下常量
+TYPE_NB, TYPE_SEC, TYPE_PAGE = 0, 1, 2
+
+
 class ModernOneNoteGUI(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -1464,9 +1845,15 @@ class ModernOneNoteGUI(QMainWindow):
         self.parser = OneNoteContentParser()
         self.selected_items=[]; self.output_dir=''
         self._busy=False
-        self._loading_thread = None  # 保持线程引用
-        self._populate_thread = None
+        self._loading_task = None  # 最近一次的任务，仅用于取消（任务由线程池删除）
+        self._populate_task = None
         self._convert_thread = None
+        # 树构建时一并登记的项目，勾选时直接用，无需遍历整棵树
+        self._all_items: List[QTreeWidgetItem] = []
+        self._page_items: List[QTreeWidgetItem] = []
+        self._page_order: Dict[str, int] = {}  # 页面ID -> 在树中的先后位置，导出时按树顺序排列
+        # 已勾选页面：页面ID -> 转换所需信息，随勾选变化增量维护
+        self._selected_pages: Dict[str, dict] = {}
         self._setup_logging(); self._init_ui(); self._apply_styles()
         
         # 设置窗口属性以提升性能
@@ -1497,7 +1884,7 @@ class ModernOneNoteGUI(QMainWindow):
         lv.addWidget(title)
         
         self.refresh_btn = QPushButton('🔄 刷新笔记本')
-        self.refresh_btn.clicked.connect(self._refresh)
+        self.refresh_btn.clicked.connect(lambda: self._refresh(force=True))
         lv.addWidget(self.refresh_btn)
         
         self.refresh_status = StatusIndicator(left)
@@ -1513,6 +1900,9 @@ class ModernOneNoteGUI(QMainWindow):
         # 设置列宽50-50分割 - 真正的50-50
         header = self.tree.header()
         header.setStretchLastSection(False)
+        # 等比例拉伸模式设置后一直有效，只需设置一次
+        header.setSectionResizeMode(0, header.Stretch)
+        header.setSectionResizeMode(1, header.Stretch)
         # 延迟设置真正的50-50分割比例
         QTimer.singleShot(100, self._setup_tree_columns)
         
@@ -1598,6 +1988,12 @@ class ModernOneNoteGUI(QMainWindow):
         self.log.setReadOnly(True)
         self.log.setMaximumHeight(240)
         rv.addWidget(self.log)
+        # 日志先缓存，50ms内的多条合并为一次追加与滚动
+        self._log_buf: List[str] = []
+        self._log_timer = QTimer(self)
+        self._log_timer.setSingleShot(True)
+        self._log_timer.setInterval(50)
+        self._log_timer.timeout.connect(self._flush_log)
 
         # 分割器 - 真正的一半一半分割
         spl = QSplitter(Qt.Horizontal)
@@ -1624,7 +2020,7 @@ class ModernOneNoteGUI(QMainWindow):
         main.addWidget(spl)
 
     def _setup_tree_columns(self):
-        """设置树控件列为真正的50-50分割"""
+        """设置树控件列的初始50-50宽度；之后的窗口缩放由表头的Stretch模式处理"""
         try:
             tree_width = self.tree.width() - 20  # 减去滚动条和边距
             col_width = tree_width // 2  # 每列占一半
@@ -1632,169 +2028,26 @@ class ModernOneNoteGUI(QMainWindow):
             self.tree.setColumnWidth(0, col_width)
             self.tree.setColumnWidth(1, col_width)
             
-            # 设置列为等比例拉伸
-            header = self.tree.header()
-            header.setSectionResizeMode(0, header.Stretch)
-            header.setSectionResizeMode(1, header.Stretch)
-            
             # 确保表头也是50-50分割
-            header.setDefaultSectionSize(col_width)
+            self.tree.header().setDefaultSectionSize(col_width)
             
         except Exception as e:
             self.logger.debug(f"设置列宽失败: {e}")
 
     def _apply_styles(self):
         """简洁的白色主题样式，完全无黑色"""
-        style = """
-        /* 主窗口 - 纯白背景 */
-        QMainWindow { 
-            background: white;
-            color: #374151;
-        }
-        
-        /* 所有控件默认白色背景 */
-        QWidget {
-            background: white;
-            color: #374151;
-        }
-        
-        /* 分组框 */
-        QGroupBox { 
-            background: white;
-            border: 1px solid #e5e7eb;
-            border-radius: 8px; 
-            padding: 15px; 
-            margin-top: 12px;
-            font-size: 14px;
-        }
-        
-        QGroupBox::title { 
-            subcontrol-origin: margin; 
-            left: 12px; 
-            padding: 0 8px; 
-            color: #1f2937; 
-            font-weight: 600;
-            background: white;
-        }
-        
-        /* 标题 */
-        QLabel#title_label { 
-            font-size: 20px; 
-            font-weight: 700; 
-            color: #1f2937; 
-            background: white;
-            padding: 10px;
-            border: 1px solid #e5e7eb;
-            border-radius: 6px;
-        }
-        
-        QLabel { 
-            color: #374151;
-            background: white;
-        }
-        
-        /* 按钮 */
-        QPushButton { 
-            background: #3b82f6;
-            color: white; 
-            border: none;
-            padding: 10px 16px; 
-            border-radius: 6px; 
-            font-weight: 600;
-            font-size: 13px;
-        }
-        
-        QPushButton:hover { 
-            background: #2563eb;
-        }
-        
-        QPushButton:disabled { 
-            background: #e5e7eb; 
-            color: #9ca3af;
-        }
-        
-        /* 树控件 - 简洁样式，保留默认展开图标 */
-        QTreeWidget { 
-            background: white;
-            border: 1px solid #e5e7eb;
-            border-radius: 6px;
-            font-size: 13px;
-            color: #374151;
-            outline: none;
-        }
-        
-        QHeaderView::section {
-            background: #f9fafb;
-            color: #374151;
-            border: none;
-            border-right: 1px solid #e5e7eb;
-            padding: 8px;
-            font-weight: 600;
-        }
-        
-        QTreeWidget::item {
-            background: white;
-            color: #374151;
-            padding: 6px;
-            height: 26px;
-        }
-        
-        QTreeWidget::item:hover {
-            background: #f3f4f6;
-        }
-        
-        QTreeWidget::item:selected {
-            background: #dbeafe;
-            color: #1e40af;
-        }
-        
-        /* 复选框 */
-        QCheckBox {
-            color: #374151;
-            background: white;
-        }
-        
-        QCheckBox::indicator {
-            width: 16px;
-            height: 16px;
-            border: 1px solid #d1d5db;
-            border-radius: 3px;
-            background: white;
-        }
-        
-        QCheckBox::indicator:checked {
-            background: #3b82f6;
-            border: 1px solid #3b82f6;
-        }
-        
-        /* 日志区域 - 白色背景 */
-        QTextEdit#log { 
-            background: white;
-            color: #374151; 
-            border: 1px solid #e5e7eb;
-            border-radius: 6px;
-            font-family: 'Consolas', monospace;
-            font-size: 11px;
-            padding: 8px;
-        }
-        
-        /* 进度条 */
-        QProgressBar { 
-            border: 1px solid #e5e7eb;
-            border-radius: 6px; 
-            height: 22px; 
-            text-align: center;
-            background: white;
-            color: #374151;
-        }
-        
-        QProgressBar::chunk { 
-            background: #10b981;
-            border-radius: 4px;
-            margin: 1px;
-        }
-        """
-        self.setStyleSheet(style)
+        # 通用的白底灰字用调色板实现；QSS只保留需要特殊外观的控件，
+        # 避免通配的QWidget规则让每个控件都参与样式表匹配
+        pal = QPalette()
+        white, text = QColor('white'), QColor('#374151')
+        for role in (QPalette.Window, QPalette.Base, QPalette.AlternateBase, QPalette.Button):
+            pal.setColor(role, white)
+        for role in (QPalette.WindowText, QPalette.Text, QPalette.ButtonText):
+            pal.setColor(role, text)
+        QApplication.setPalette(pal)
+        self.setPalette(pal)
+        
+        self.setStyleSheet(_MAIN_QSS)
 
     # ---- 动作 ----
     def _auto_detect(self):
@@ -1829,30 +2082,40 @@ class ModernOneNoteGUI(QMainWindow):
 
     def _log(self, msg: str):
         ts = QDateTime.currentDateTime().toString('hh:mm:ss')
-        self.log.append(f'[{ts}] {msg}')
+        self._log_buf.append(f'[{ts}] {msg}')
+        if not self._log_timer.isActive():
+            self._log_timer.start()
+
+    def _flush_log(self):
+        if not self._log_buf:
+            return
+        self.log.append('\n'.join(self._log_buf))
+        self._log_buf.clear()
         self.log.verticalScrollBar().setValue(self.log.verticalScrollBar().maximum())
 
-    def _refresh(self):
+    def _refresh(self, force: bool = False):
         if self._busy: return
+        if force:
+            # 手动刷新必须重新读取层级
+            self.onenote.invalidate_notebooks()
         self._set_busy(True)
         self.refresh_status.show_loading('🔍 正在检测OneNote...')
         self.tree.clear()
+        # 树项已随clear()删除，登记表必须同时清空
+        self._all_items.clear(); self._page_items.clear(); self._page_order.clear()
+        self._selected_pages.clear()
         self._log('开始加载笔记本...')
         
-        # 清理之前的缓存
-        if hasattr(self, '_item_cache'):
-            self._item_cache.clear()
-        
-        # 确保之前的线程已停止
-        if self._loading_thread and self._loading_thread.isRunning():
-            self._loading_thread.terminate()
-            self._loading_thread.wait(100)
+        # 之前的任务只标记取消，不再强行终止线程
+        if self._loading_task:
+            self._loading_task.cancel()
         
-        self._loading_thread = _DetectWorker(self.onenote)
-        self._loading_thread.progress.connect(self._on_detect_progress, Qt.QueuedConnection)
-        self._loading_thread.done.connect(self._on_loaded, Qt.QueuedConnection)
-        self._loading_thread.err.connect(self._on_load_err, Qt.QueuedConnection)
-        self._loading_thread.start(QThread.HighPriority)  # 高优先级
+        self._loading_task = _DetectWorker(self.onenote, self)
+        sig = self._loading_task.signals
+        sig.progress.connect(self._on_detect_progress, Qt.QueuedConnection)
+        sig.done.connect(self._on_loaded, Qt.QueuedConnection)
+        sig.err.connect(self._on_load_err, Qt.QueuedConnection)
+        QThreadPool.globalInstance().start(self._loading_task)
     
     def _on_detect_progress(self, msg: str):
         """处理检测进度"""
@@ -1864,18 +2127,17 @@ class ModernOneNoteGUI(QMainWindow):
         self.refresh_status.show_loading('📚 读取笔记本 0%')
         self._log('📚 开始读取笔记本结构...')
         
-        # 确保之前的线程已停止
-        if self._populate_thread and self._populate_thread.isRunning():
-            self._populate_thread.terminate()
-            self._populate_thread.wait(100)
-        
-        self._populate_thread = _PopulateWorker(notebooks)
-        self._populate_thread.all_data.connect(self._build_tree_fast, Qt.QueuedConnection)
-        self._populate_thread.progress.connect(self._on_populate_progress, Qt.QueuedConnection)
-        self._populate_thread.msg.connect(self._log, Qt.QueuedConnection)
-        self._populate_thread.done.connect(self._on_pop_done, Qt.QueuedConnection)
-        self._populate_thread.err.connect(self._on_pop_err, Qt.QueuedConnection)
-        self._populate_thread.start(QThread.HighPriority)
+        if self._populate_task:
+            self._populate_task.cancel()
+        
+        self._populate_task = _PopulateWorker(notebooks, self)
+        sig = self._populate_task.signals
+        sig.all_data.connect(self._build_tree_fast, Qt.QueuedConnection)
+        sig.progress.connect(self._on_populate_progress, Qt.QueuedConnection)
+        sig.msg.connect(self._log, Qt.QueuedConnection)
+        sig.done.connect(self._on_pop_done, Qt.QueuedConnection)
+        sig.err.connect(self._on_pop_err, Qt.QueuedConnection)
+        QThreadPool.globalInstance().start(self._populate_task)
     
     def _on_populate_progress(self, percent: int):
         """处理构建进度"""
@@ -1887,140 +2149,68 @@ class ModernOneNoteGUI(QMainWindow):
         self.refresh_status.hide_loading(); self._set_busy(False)
         self._log(f'❌ 加载失败: {msg}')
 
-    def _build_tree_fast(self, notebooks: dict):
-        """超高速构建整个树形结构"""
+    def _build_tree_fast(self, notebooks: list):
+        """超高速构建整个树形结构：先建好脱离视图的子项，再一次性挂到树上"""
         try:
-            # 彻底禁用所有更新和信号
+            # 彻底禁用所有更新和信号；QSignalBlocker 离开with块时自动恢复信号
             self.tree.setUpdatesEnabled(False)
-            self.tree.blockSignals(True)
-            self.tree.setVisible(False)  # 隐藏控件加速构建
-            
-            # 使用QTimer来分段处理，避免阻塞UI
-            self._notebooks_data = notebooks
-            self._build_items = []
-            self._build_index = 0
-            
-            # 预处理所有项目
-            for nb_id, nb_data in notebooks.items():
-                nb_name = nb_data['name']
-                self._build_items.append(('notebook', None, nb_id, nb_name))
-                
-                for sec_id, sec_data in nb_data.get('sections', {}).items():
-                    sec_name = sec_data['name']
-                    self._build_items.append(('section', nb_id, sec_id, sec_name))
-                    
-                    for page_id, page_data in sec_data.get('pages', {}).items():
-                        page_name = page_data['name']
-                        self._build_items.append(('page', sec_id, page_id, page_name))
-            
-            # 使用定时器分批处理，避免UI阻塞
-            self._item_cache = {}
-            self._build_timer = QTimer()
-            self._build_timer.timeout.connect(self._build_batch)
-            self._build_timer.start(1)  # 每1ms处理一批
-            
-        except Exception as e:
-            self._log(f'❌ 快速构建失败: {e}')
-            self._finish_build()
-    
-    def _build_batch(self):
-        """分批构建树项目"""
-        try:
-            batch_size = 100  # 每次处理100个项目
-            end_index = min(self._build_index + batch_size, len(self._build_items))
-            
-            for i in range(self._build_index, end_index):
-                item_type, parent_id, item_id, item_name = self._build_items[i]
-                
-                if item_type == 'notebook':
-                    it = QTreeWidgetItem(self.tree)
-                    it.setText(0, f'📚 {item_name}')
-                    it.setText(1, '笔记本')
+            with QSignalBlocker(self.tree):
+                def make_item(text: str, kind: str, data: tuple) -> QTreeWidgetItem:
+                    it = QTreeWidgetItem([text, kind])
                     it.setFlags(it.flags() | Qt.ItemIsUserCheckable)
                     it.setCheckState(0, Qt.Unchecked)
-                    it.setData(0, Qt.UserRole, {'type': 'notebook', 'id': item_id, 'name': item_name})
-                    it.setExpanded(True)
-                    self._item_cache[item_id] = it
-                    
-                elif item_type == 'section':
-                    parent = self._item_cache.get(parent_id)
-                    if parent:
-                        it = QTreeWidgetItem(parent)
-                        it.setText(0, f'📁 {item_name}')
-                        it.setText(1, '分区')
-                        it.setFlags(it.flags() | Qt.ItemIsUserCheckable)
-                        it.setCheckState(0, Qt.Unchecked)
-                        it.setData(0, Qt.UserRole, {'type': 'section', 'id': item_id, 'name': item_name})
-                        self._item_cache[item_id] = it
+                    it.setData(0, Qt.UserRole, data)
+                    self._all_items.append(it)
+                    if data[0] == TYPE_PAGE:
+                        self._page_order[data[1]] = len(self._page_items)
+                        self._page_items.append(it)
+                    return it
+            
+                # 子项在挂到树之前没有模型，创建与addChildren都不会触发插入信号和布局
+                top = []
+                # 显示文本已由_PopulateWorker拼好，这里只创建项
+                for nb_id, nb_text, nb_name, sec_rows in notebooks:
+                    nb_item = make_item(nb_text, '笔记本', (TYPE_NB, nb_id, nb_name))
                 
-                elif item_type == 'page':
-                    parent = self._item_cache.get(parent_id)
-                    if parent:
-                        it = QTreeWidgetItem(parent)
-                        it.setText(0, f'📄 {item_name}')
-                        it.setText(1, '页面')
-                        it.setFlags(it.flags() | Qt.ItemIsUserCheckable)
-                        it.setCheckState(0, Qt.Unchecked)
-                        it.setData(0, Qt.UserRole, {'type': 'page', 'id': item_id, 'name': item_name})
-            
-            self._build_index = end_index
+                    sections = []
+                    for sec_id, sec_text, sec_name, page_rows in sec_rows:
+                        sec_item = make_item(sec_text, '分区', (TYPE_SEC, sec_id, sec_name))
+                        sec_item.addChildren([
+                            make_item(page_text, '页面', (TYPE_PAGE, page_id, page_name))
+                            for page_id, page_text, page_name in page_rows
+                        ])
+                        sections.append(sec_item)
+                
+                    nb_item.addChildren(sections)
+                    top.append(nb_item)
             
-            # 更新进度
-            progress = int(self._build_index * 100 / len(self._build_items))
-            if progress % 10 == 0 and progress < 100:  # 每10%更新一次，但不显示100%
-                self.refresh_status.show_loading(f'📚 读取笔记本 {progress}%')
+                self.tree.addTopLevelItems(top)
+                # setExpanded 只对已加入视图的项生效
+                for nb_item in top:
+                    nb_item.setExpanded(True)
             
-            # 检查是否完成
-            if self._build_index >= len(self._build_items):
-                self._build_timer.stop()
-                # 完成时不显示任何状态，直接隐藏
-                self._finish_build()
-                
         except Exception as e:
-            self._log(f'❌ 批处理失败: {e}')
-            self._build_timer.stop()
+            self._log(f'❌ 快速构建失败: {e}')
+        finally:
             self._finish_build()
     
     def _finish_build(self):
         """完成构建"""
         try:
-            # 恢复控件
-            self.tree.setVisible(True)
-            self.tree.blockSignals(False)
+            # 恢复控件（信号已由QSignalBlocker恢复）
             self.tree.setUpdatesEnabled(True)
             
             # 立即隐藏加载状态，不显示任何完成信息
             self.refresh_status.hide_loading()
-            
-            # 清理
-            if hasattr(self, '_build_items'):
-                del self._build_items
-            if hasattr(self, '_build_index'):
-                del self._build_index
-            if hasattr(self, '_notebooks_data'):
-                del self._notebooks_data
                 
         except Exception as e:
             self._log(f'❌ 完成构建时出错: {e}')
 
-    def _find_item_by_id(self, id_: str):
-        it = QTreeWidgetItemIterator(self.tree)
-        while it.value():
-            item = it.value()
-            d=item.data(0,Qt.UserRole)
-            if d and d.get('id')==id_: return item
-            it+=1
-        return None
-
     def _on_pop_done(self, nb:int, sec:int, pg:int):
         """完成界面构建"""
         # 立即隐藏加载状态
         self.refresh_status.hide_loading()
         self._log(f'✅ 读取完成：{nb} 笔记本，{sec} 分区，{pg} 页面')
-        
-        # 清理缓存
-        if hasattr(self, '_item_cache'):
-            self._item_cache.clear()
         self._set_busy(False)
 
     def _on_pop_err(self, msg:str):
@@ -2028,42 +2218,50 @@ class ModernOneNoteGUI(QMainWindow):
         self.refresh_status.hide_loading()
         self._set_busy(False)
         self._log(f'❌ 构建失败: {msg}')
-        # 清理缓存
-        if hasattr(self, '_item_cache'):
-            self._item_cache.clear()
+
+    @contextmanager
+    def _cascade_guard(self):
+        """批量修改勾选状态期间断开itemChanged并暂停重绘，结束后恢复并整体刷新一次"""
+        self.tree.itemChanged.disconnect(self._on_item_changed)
+        self.tree.setUpdatesEnabled(False)
+        try:
+            yield
+        finally:
+            self.tree.setUpdatesEnabled(True)
+            self.tree.itemChanged.connect(self._on_item_changed)
+            self.tree.viewport().update()
 
     def _on_item_changed(self, item, col):
         """处理树控件项目变化，实现级联勾选"""
         if col != 0:  # 只处理第一列的勾选变化
             return
             
-        # 临时阻塞信号，避免级联操作触发无限递归
-        self.tree.blockSignals(True)
-        
-        try:
+        # 只断开本槽函数（避免级联操作触发无限递归），树的其他信号照常发出
+        with self._cascade_guard():
             data = item.data(0, Qt.UserRole)
             if not data:
                 return
                 
-            item_type = data.get('type')
+            item_type = data[0]
             check_state = item.checkState(0)
             
-            if item_type == 'notebook':
-                # 勾选/取消勾选笔记本时，级联到所有分区和页面
+            # 级联期间槽函数已断开，子项变化不会再逐个回算父级；
+            # 级联结束后只对被点击项的祖先做一次状态计算
+            if item_type == TYPE_NB:
+                # 勾选/取消勾选笔记本时，级联到所有分区和页面；笔记本自身状态已确定
                 self._cascade_check_notebook(item, check_state)
-            elif item_type == 'section':
-                # 勾选/取消勾选分区时，级联到该分区下的所有页面
+            elif item_type == TYPE_SEC:
+                # 勾选/取消勾选分区时，级联到该分区下的所有页面，再回算一次所属笔记本
                 self._cascade_check_section(item, check_state)
-            elif item_type == 'page':
+                self._update_notebook_check_state(item)
+            elif item_type == TYPE_PAGE:
+                self._track_page(item, check_state == Qt.Checked)
                 # 页面勾选变化时，检查是否需要更新父分区的状态
                 self._update_parent_check_state(item)
                 
-        finally:
-            # 恢复信号
-            self.tree.blockSignals(False)
-            # 更新选择状态和转换按钮
-            self._update_selection()
-            self._update_convert()
+        # 更新选择状态和转换按钮
+        self._update_selection()
+        self._update_convert()
     
     def _cascade_check_notebook(self, notebook_item, check_state):
         """级联勾选笔记本下的所有分区和页面"""
@@ -2078,6 +2276,18 @@ class ModernOneNoteGUI(QMainWindow):
         for i in range(section_item.childCount()):
             page_item = section_item.child(i)
             page_item.setCheckState(0, check_state)
+            self._track_page(page_item, check_state == Qt.Checked)
+
+    def _track_page(self, page_item, checked: bool):
+        """登记/移除单个页面的勾选记录"""
+        d = page_item.data(0, Qt.UserRole)
+        if not checked:
+            self._selected_pages.pop(d[1], None)
+        elif d[1] not in self._selected_pages:
+            sec = page_item.parent(); nb = sec.parent() if sec else None
+            self._selected_pages[d[1]] = {'page_id': d[1], 'page_name': d[2],
+                                          'section_name': sec.data(0, Qt.UserRole)[2] if sec else '',
+                                          'notebook_name': nb.data(0, Qt.UserRole)[2] if nb else ''}
     
     def _update_parent_check_state(self, page_item):
         """根据子页面的勾选状态更新父分区的勾选状态"""
@@ -2132,16 +2342,13 @@ class ModernOneNoteGUI(QMainWindow):
         else:
             notebook_item.setCheckState(0, Qt.PartiallyChecked)
 
+    def _selected_in_tree_order(self) -> List[dict]:
+        """勾选记录按勾选先后登记，导出与日志仍按树中的顺序进行"""
+        return sorted(self._selected_pages.values(), key=lambda it: self._page_order[it['page_id']])
+
     def _update_selection(self):
-        sel=[]; it=QTreeWidgetItemIterator(self.tree)
-        while it.value():
-            item=it.value(); d=item.data(0,Qt.UserRole)
-            if d and d.get('type')=='page' and item.checkState(0)==Qt.Checked:
-                # 收集父级名称
-                sec=item.parent(); nb=sec.parent() if sec else None
-                sel.append({'page_id': d['id'], 'page_name': d['name'], 'section_name': (sec.data(0,Qt.UserRole) or {}).get('name',''), 'notebook_name': (nb.data(0,Qt.UserRole) or {}).get('name','')})
-            it+=1
-        self.selected_items=sel
+        # 勾选记录已随级联增量维护，这里不再扫描页面
+        self.selected_items=list(self._selected_pages.values())
 
     def _update_convert(self):
         ok = bool(self.selected_items) and bool(self.output_dir)
@@ -2154,21 +2361,20 @@ class ModernOneNoteGUI(QMainWindow):
             self.output_dir=d; self.lbl_out.setText(d); self._update_convert()
 
     def _select_all(self):
-        it=QTreeWidgetItemIterator(self.tree)
-        while it.value():
-            item=it.value()
-            if item.flags() & Qt.ItemIsUserCheckable:
+        # 全部项目都直接设置，不需要_on_item_changed逐项级联
+        with self._cascade_guard():
+            for item in self._all_items:
                 item.setCheckState(0,Qt.Checked)
-            it+=1
+            for item in self._page_items:
+                self._track_page(item, True)
         self._update_selection(); self._update_convert()
 
     def _select_none(self):
-        it=QTreeWidgetItemIterator(self.tree)
-        while it.value():
-            item=it.value()
-            if item.flags() & Qt.ItemIsUserCheckable:
+        # 全部项目都直接设置，不需要_on_item_changed逐项级联
+        with self._cascade_guard():
+            for item in self._all_items:
                 item.setCheckState(0,Qt.Unchecked)
-            it+=1
+            self._selected_pages.clear()
         self._update_selection(); self._update_convert()
 
     def _convert(self):
@@ -2180,7 +2386,7 @@ class ModernOneNoteGUI(QMainWindow):
         self.conv_status.show_loading('🚀 正在转换...')
         self.progress.setVisible(True)
         self.progress.setValue(0)
-        self.log.clear()
+        self._log_buf.clear(); self.log.clear()
         
         # 确保之前的转换线程已停止
         if self._convert_thread and self._convert_thread.isRunning():
@@ -2188,7 +2394,7 @@ class ModernOneNoteGUI(QMainWindow):
             self._convert_thread.wait(100)
         
         self._convert_thread = _ConvertWorker(
-            self.onenote, self.parser, self.selected_items, self.output_dir,
+            self.onenote, self.parser, self._selected_in_tree_order(), self.output_dir,
             self.cb_pdf.isChecked(), self.cb_docx.isChecked(),
             self.cb_img.isChecked(), self.cb_att.isChecked()
         )
@@ -2210,111 +2416,151 @@ class ModernOneNoteGUI(QMainWindow):
     def closeEvent(self, event):
         """关闭事件处理"""
         try:
-            # 停止所有线程
-            for thread in [getattr(self, '_loading_thread', None), 
-                          getattr(self, '_populate_thread', None), 
-                          getattr(self, '_convert_thread', None)]:
-                if thread and thread.isRunning():
-                    thread.terminate()
-                    thread.wait(100)
-            
-            # 停止所有定时器
-            if hasattr(self, '_build_timer') and self._build_timer.isActive():
-                self._build_timer.stop()
+            # 线程池任务标记取消，转换线程仍需停止
+            for task in (self._loading_task, self._populate_task):
+                if task:
+                    task.cancel()
+            thread = getattr(self, '_convert_thread', None)
+            if thread and thread.isRunning():
+                thread.terminate()
+                thread.wait(100)
             
             # 清理资源
             if hasattr(self, 'parser'):
                 self.parser.cleanup_temp_files()
+            self.onenote.close()
                 
         except Exception:
             pass  # 忽略关闭时的错误
         finally:
             event.accept()
-    
-    def resizeEvent(self, event):
-        """窗口大小改变时重新调整列宽"""
-        super().resizeEvent(event)
-        # 延迟调整列宽，确保窗口大小调整完成
-        QTimer.singleShot(10, self._setup_tree_columns)
 
 
 # ======= 线程 =======
-class _DetectWorker(QThread):
+class _PoolTask(QRunnable):
+    """在全局线程池中运行的任务：信号放在 signals(QObject) 上，取消只置标记，不强行终止线程。
+    任务对象由线程池在run()返回后删除（autoDelete）；signals 以窗口为父对象，
+    窗口替换任务引用后仍不会被回收，收到 finished 后才 deleteLater"""
+    def __init__(self, signals: QObject):
+        super().__init__()
+        self.signals = signals
+        self._cancelled = threading.Event()
+        signals.finished.connect(signals.deleteLater)
+
+    def run(self):
+        try:
+            self.work()
+        finally:
+            # finished 总会发出（包括已取消的任务），是最后一次使用 signals
+            self.signals.finished.emit()
+
+    def work(self):
+        raise NotImplementedError
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def emit(self, name: str, *args):
+        # 已取消的任务不再向界面发送结果
+        if not self._cancelled.is_set():
+            getattr(self.signals, name).emit(*args)
+
+
+class _DetectSignals(QObject):
+    finished = pyqtSignal()
     progress = pyqtSignal(str)
     done = pyqtSignal(dict)
     err = pyqtSignal(str)
-    
-    def __init__(self, api: OneNoteAPI):
-        super().__init__()
+
+
+class _DetectWorker(_PoolTask):
+    def __init__(self, api: OneNoteAPI, parent: QObject):
+        super().__init__(_DetectSignals(parent))
         self.api=api
-        self.setTerminationEnabled(True)
         
-    def run(self):
+    def work(self):
         try:
             # 发送初始进度
-            self.progress.emit('🔍 正在连接OneNote...')
-            self.msleep(10)  # 让UI有机会更新
-            
-            if not self.api.initialize():
-                self.err.emit('无法连接OneNote')
-                return
+            self.emit('progress', '🔍 正在连接OneNote...')
             
-            # 获取笔记本
-            self.progress.emit('📚 正在获取笔记本列表...')
-            self.msleep(10)  # 让UI有机会更新
-            
-            nbs = self.api.get_notebooks()
+            # COM的初始化与反初始化限定在本任务内，线程池线程不残留COM状态与代理
+            with self.api.com_thread(create=False):
+                if not self.api.initialize():
+                    self.emit('err', '无法连接OneNote')
+                    return
+                
+                # 获取笔记本
+                self.emit('progress', '📚 正在获取笔记本列表...')
+                
+                nbs = self.api.get_notebooks()
             if not nbs:
-                self.err.emit('未发现笔记本')
+                self.emit('err', '未发现笔记本')
                 return
             
             # 计算统计信息
             total = sum(len(s.get('pages',{})) for nb in nbs.values() for s in nb.get('sections',{}).values())
-            self.progress.emit(f'✅ 发现 {len(nbs)} 个笔记本，{total} 个页面')
-            self.msleep(10)  # 让UI有机会更新
+            self.emit('progress', f'✅ 发现 {len(nbs)} 个笔记本，{total} 个页面')
             
-            self.done.emit(nbs)
+            self.emit('done', nbs)
         except Exception as e:
-            self.err.emit(str(e))
+            self.emit('err', str(e))
 
 
-class _PopulateWorker(QThread):
-    all_data = pyqtSignal(dict)  # 一次性发送所有数据
+class _PopulateSignals(QObject):
+    finished = pyqtSignal()
+    all_data = pyqtSignal(list)  # 一次性发送所有数据（已整理为显示用的嵌套列表）
     progress = pyqtSignal(int)
     msg = pyqtSignal(str)
     done = pyqtSignal(int,int,int)
     err = pyqtSignal(str)
-    
-    def __init__(self, notebooks: dict):
-        super().__init__()
+
+
+class _PopulateWorker(_PoolTask):
+    def __init__(self, notebooks: dict, parent: QObject):
+        super().__init__(_PopulateSignals(parent))
         self.nbs = notebooks
-        self.setTerminationEnabled(True)
         
-    def run(self):
+    def work(self):
         """一次性处理所有数据，不分批"""
         try:
             nb_count = len(self.nbs)
             sec_count = 0
             pg_count = 0
             
-            # 统计数量
-            for nb_data in self.nbs.values():
-                for sec_data in nb_data.get('sections', {}).values():
+            # 统计数量，同时在工作线程中拼好显示文本：
+            # [(ID, 显示文本, 名称, [分区...])]，分区为 (ID, 显示文本, 名称, [(页面ID, 显示文本, 名称)])
+            tree = []
+            for nb_id, nb_data in self.nbs.items():
+                nb_name = nb_data['name']
+                sections = []
+                for sec_id, sec_data in nb_data.get('sections', {}).items():
+                    sec_name = sec_data['name']
+                    pages = [(page_id, f'📄 {page_data["name"]}', page_data['name'])
+                             for page_id, page_data in sec_data.get('pages', {}).items()]
+                    sections.append((sec_id, f'📁 {sec_name}', sec_name, pages))
                     sec_count += 1
-                    pg_count += len(sec_data.get('pages', {}))
+                    pg_count += len(pages)
+                tree.append((nb_id, f'📚 {nb_name}', nb_name, sections))
             
-            # 发送进度更新
-            self.progress.emit(50)
-            self.msleep(10)  # 让UI有机会更新
+            # 发送进度更新（跨线程信号本身即排队，不需要休眠让出UI）
+            self.emit('progress', 50)
             
             # 一次性发送所有数据，让UI线程处理
-            self.all_data.emit(self.nbs)
+            self.emit('all_data', tree)
             
-            self.progress.emit(100)
-            self.done.emit(nb_count, sec_count, pg_count)
+            self.emit('progress', 100)
+            self.emit('done', nb_count, sec_count, pg_count)
             
         except Exception as e:
-            self.err.emit(str(e))
+            self.emit('err', str(e))
+
+
+# 文件名只保留字母数字、空白、-、_、.（与原先 isalnum 规则一致），过滤在正则引擎中完成
+_UNSAFE_NAME_RE = re.compile(r'[^\w\-. ]')
+
+
+def _safe_name(s: str) -> str:
+    return _UNSAFE_NAME_RE.sub('', s or '未命名').strip()[:100] or '未命名'
 
 
 class _ConvertWorker(QThread):
@@ -2327,35 +2573,28 @@ class _ConvertWorker(QThread):
     def run(self):
         try:
             n=len(self.items); done=0
+            pages = []
+            dirs: Dict[Tuple[str, str], Path] = {}  # 同一分区的页面共用目录，只创建一次
             for it in self.items:
-                pid=it['page_id']; name=it['page_name']; nb=it['notebook_name']; sec=it['section_name']
-                safe=lambda s: ''.join(c for c in (s or '未命名') if c.isalnum() or c in (' ','-','_','.')).strip()[:100] or '未命名'
-                d = self.out/safe(nb)/safe(sec); d.mkdir(parents=True, exist_ok=True)
-                xml = self.api.get_page_content(pid)
-                if not xml: self.msg.emit(f'⚠️ 空页面: {name}'); continue
-                
-                # Word: 内嵌附件
-                if self.docx:
-                    out = d/f'{safe(name)}.docx'
-                    att = d/f'{safe(name)}_attachments' if self.attach else None
-                    ok = self.parser.parse_page_to_docx(xml, name, str(out), 
-                                                        include_images=self.images, 
-                                                        include_attachments=self.attach,
-                                                        embed_attachments=True,  # Word内嵌附件
-                                                        attachments_output_dir=att)
-                    self.msg.emit(f'{"✅" if ok else "❌"} Word: {name}')
-                
-                # PDF: 附件保存到目录
-                if self.pdf:
-                    out = d/f'{safe(name)}.pdf'
-                    att = d/f'{safe(name)}_attachments' if self.attach else None
-                    ok = self.parser.parse_page_to_pdf(xml, name, str(out), 
-                                                       include_images=self.images,
-                                                       include_attachments=self.attach,
-                                                       attachments_output_dir=att)  # PDF附件外置
-                    self.msg.emit(f'{"✅" if ok else "❌"} PDF: {name}')
-                
-                done+=1; self.progress.emit(int(done/max(n,1)*100))
+                pid=it['page_id']; name=it['page_name']; key=(it['notebook_name'], it['section_name'])
+                d = dirs.get(key)
+                if d is None:
+                    d = dirs[key] = self.out/_safe_name(key[0])/_safe_name(key[1])
+                    d.mkdir(parents=True, exist_ok=True)
+                pages.append((pid, name, d/_safe_name(name)))
+
+            # 取页面内容在本线程串行执行（COM对象为本线程创建），各页Word/PDF生成并行
+            with self.api.com_thread():
+                for name, word_ok, pdf_ok in self.parser.parse_pages_batch(
+                        pages, self.api.get_page_content, docx=self.docx, pdf=self.pdf,
+                        include_images=self.images, include_attachments=self.attach):
+                    if word_ok is None and pdf_ok is None:
+                        self.msg.emit(f'⚠️ 空页面: {name}')
+                    if word_ok is not None:
+                        self.msg.emit(f'{"✅" if word_ok else "❌"} Word: {name}')
+                    if pdf_ok is not None:
+                        self.msg.emit(f'{"✅" if pdf_ok else "❌"} PDF: {name}')
+                    done+=1; self.progress.emit(int(done/max(n,1)*100))
             self.done.emit()
         except Exception as e:
             self.err.emit(str(e))